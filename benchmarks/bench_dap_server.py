@@ -0,0 +1,263 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+"""
+Load test of the DAP server with many simulated clients
+
+A `coredumpy host` is started on a Unix domain socket (or a TCP port with
+--port) and --clients clients connect to it at the same time. Each client
+runs --sessions debug sessions on the generated dumps:
+
+    initialize, launch, threads, stackTrace, scopes, variables,
+    variables (of a container), evaluate, disconnect
+
+The latency of each request is measured from sending it to receiving its
+response. The p50/p95/p99 latency and the throughput of each command are
+reported, and can be saved as JSON.
+
+    python benchmarks/bench_dap_server.py --clients 50 --sessions 4
+    python benchmarks/bench_dap_server.py --clients 10 --size 100000 --server-args="--cache-size 0"
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import coredumpy
+
+
+class Node:
+    def __init__(self, value):
+        self.value = value
+        self.children = [str(value), float(value)]
+
+
+def create_dump(path, size, seed):
+    def crash(items, mapping):
+        total = seed
+        coredumpy.dump(path=path)
+        return total
+
+    items = [Node(i + seed) for i in range(size)]
+    mapping = {f"key{i}": i for i in range(size // 10)}
+    crash(items, mapping)
+
+
+class DapClient:
+    """
+    A DAP client that matches the responses to the requests by seq, so the
+    events sent by the server in between are skipped
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.seq = 1
+        self.pending: dict[int, asyncio.Future] = {}
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.reader_task = asyncio.create_task(self.read_messages())
+
+    async def read_messages(self):
+        try:
+            while True:
+                header = await self.reader.readuntil(b"\r\n\r\n")
+                content_length = 0
+                for line in header.split(b"\r\n"):
+                    if line.startswith(b"Content-Length: "):
+                        content_length = int(line.split(b": ")[1])
+                message = json.loads(await self.reader.readexactly(content_length))
+                if message.get("type") == "response":
+                    future = self.pending.pop(message["request_seq"], None)
+                    if future is not None:
+                        future.set_result(message)
+                elif message.get("type") == "event":
+                    self.events.put_nowait(message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self.pending.values():
+                future.set_exception(ConnectionError("The server closed the connection"))
+
+    async def request(self, command: str, arguments=None) -> tuple[dict, float]:
+        """
+        @return:
+            The response and the latency in seconds
+        """
+        seq = self.seq
+        self.seq += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[seq] = future
+        content = json.dumps({"type": "request", "seq": seq, "command": command,
+                              "arguments": arguments or {}}).encode()
+        start = time.perf_counter()
+        self.writer.write(f"Content-Length: {len(content)}\r\n\r\n".encode() + content)
+        response = await future
+        latency = time.perf_counter() - start
+        if not response.get("success", True):
+            raise RuntimeError(f"{command} failed: {response.get('message')}")
+        return response, latency
+
+    async def wait_event(self, name: str) -> dict:
+        while True:
+            event = await self.events.get()
+            if event["event"] == name:
+                return event
+
+    async def close(self):
+        self.reader_task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:  # pragma: no cover
+            pass
+
+
+async def run_session(client: DapClient, dump_path: str, latencies: dict[str, list[float]]):
+    async def request(command, arguments=None, name=None):
+        response, latency = await client.request(command, arguments)
+        latencies.setdefault(name or command, []).append(latency)
+        return response.get("body", {})
+
+    await request("initialize", {"clientID": "bench", "adapterID": "coredumpy"})
+    await client.wait_event("initialized")
+    await request("launch", {"program": dump_path})
+    await client.wait_event("stopped")
+    threads = (await request("threads"))["threads"]
+    frames = (await request("stackTrace", {"threadId": threads[0]["id"], "startFrame": 0, "levels": 20}))["stackFrames"]
+    frame_id = frames[0]["id"]
+    scopes = (await request("scopes", {"frameId": frame_id}))["scopes"]
+    variables = (await request("variables", {"variablesReference": scopes[0]["variablesReference"]}))["variables"]
+    for variable in variables:
+        if variable["variablesReference"]:
+            await request("variables", {"variablesReference": variable["variablesReference"], "start": 0, "count": 100},
+                          name="variables (container)")
+            break
+    await request("evaluate", {"frameId": frame_id, "expression": "[item.value for item in items[:100]]"})
+    await request("disconnect")
+
+
+async def run_client(connect, dump_paths: list[str], sessions: int, index: int,
+                     latencies: dict[str, list[float]], errors: list[str]):
+    for i in range(sessions):
+        try:
+            client = DapClient(*await connect())
+            try:
+                await run_session(client, dump_paths[(index + i) % len(dump_paths)], latencies)
+            finally:
+                await client.close()
+        except Exception as e:
+            errors.append(f"client {index} session {i}: {e!r}")
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """
+    The nearest-rank percentile of a sorted list
+    """
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: dict[str, list[float]], elapsed: float) -> dict:
+    summary = {}
+    for command, values in latencies.items():
+        values = sorted(values)
+        summary[command] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1],
+            "throughput": len(values) / elapsed,
+        }
+    return summary
+
+
+def start_server(args, tmpdir):
+    if args.port is None:
+        address = os.path.join(tmpdir, "dap.sock")
+        server_args = ["--unix", address]
+    else:
+        address = ("localhost", args.port)
+        server_args = ["--port", str(args.port)]
+    process = subprocess.Popen([sys.executable, "-m", "coredumpy", "host"] + server_args + shlex.split(args.server_args),
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    assert process.stdout is not None
+    for line in process.stdout:
+        if b"listening for connections" in line:
+            break
+    else:
+        raise RuntimeError("Failed to start the DAP server")
+    return process, address
+
+
+async def run(args, address, dump_paths):
+    if isinstance(address, str):
+        async def connect():
+            return await asyncio.open_unix_connection(address, limit=2 ** 24)
+    else:
+        async def connect():
+            return await asyncio.open_connection(*address, limit=2 ** 24)
+
+    latencies: dict[str, list[float]] = {}
+    errors: list[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(connect, dump_paths, args.sessions, i, latencies, errors)
+                           for i in range(args.clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="The number of concurrent clients")
+    parser.add_argument("--sessions", type=int, default=3, help="The number of debug sessions of each client")
+    parser.add_argument("--dumps", type=int, default=4, help="The number of different dumps to debug")
+    parser.add_argument("--size", type=int, default=10000, help="The number of objects in the list of each dump")
+    parser.add_argument("--port", type=int, default=None, help="Listen on this TCP port instead of a Unix socket")
+    parser.add_argument("--server-args", default="", help="Extra arguments of coredumpy host")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dump_paths = [os.path.join(tmpdir, f"bench_{i}.dump") for i in range(args.dumps)]
+        for i, path in enumerate(dump_paths):
+            create_dump(path, args.size, i)
+
+        process, address = start_server(args, tmpdir)
+        try:
+            latencies, errors, elapsed = asyncio.run(run(args, address, dump_paths))
+        finally:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(latencies, elapsed)
+    print(f"{args.clients} clients x {args.sessions} sessions in {elapsed:.2f}s, "
+          f"{sum(len(values) for values in latencies.values()) / elapsed:.1f} requests/s")
+    print(f"{'command':<24} {'count':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} {'req/s':>9}")
+    for command, stats in summary.items():
+        print(f"{command:<24} {stats['count']:>7} {stats['p50'] * 1000:>9.2f} {stats['p95'] * 1000:>9.2f} "
+              f"{stats['p99'] * 1000:>9.2f} {stats['max'] * 1000:>9.2f} {stats['throughput']:>9.1f}")
+    for error in errors:
+        print(f"Error: {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "clients": args.clients,
+                "sessions": args.sessions,
+                "dumps": args.dumps,
+                "size": args.size,
+                "elapsed": elapsed,
+                "commands": summary,
+                "errors": errors,
+            }, f, indent=2)
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+"""
+Synthetic workloads for the dump and load hot paths
+
+Each workload builds a crash site and measures dumps, dump,
+load_data_from_path and peek on it, for the time (the best of --repeat
+runs), the peak memory (traced by tracemalloc in a separate run) and the
+output size. The results can be saved as JSON and compared against a
+baseline, the command fails if the size or the peak memory is more than
+--threshold worse.
+
+The times depend on the machine and are noisy, so they are only compared
+with --compare-time, against --time-threshold. Regenerate the baseline with
+--output on the machine that runs the comparison first.
+
+    python benchmarks/bench_dump.py --output results.json
+    python benchmarks/bench_dump.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_dump.py --compare-time --time-threshold 1.0
+    python benchmarks/bench_dump.py --workload deep_graph --scale 4
+
+benchmarks/baseline.json is the baseline of the default scale.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import coredumpy
+from coredumpy.coredumpy import load_data_from_path, peek
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Node:
+    def __init__(self, value, next_node=None):
+        self.value = value
+        self.next_node = next_node
+
+
+def deep_graph(measure, n):
+    head = None
+    for i in range(n):
+        head = Node(i, head)
+    measure(depth=n * 2 + 2)
+
+
+def wide_graph(measure, n):
+    nodes = {f"node{i}": Node(i, [str(i), float(i), (i, i)]) for i in range(n)}  # noqa: F841
+    measure()
+
+
+def many_threads(measure, n):
+    event = threading.Event()
+    threads = [threading.Thread(target=event.wait) for _ in range(n // 100)]
+    for thread in threads:
+        thread.start()
+    try:
+        measure()
+    finally:
+        event.set()
+        for thread in threads:
+            thread.join()
+
+
+def long_recursion(measure, n):
+    def recurse(depth, payload):
+        if depth == 0:
+            measure()
+        else:
+            recurse(depth - 1, [depth] * 10)
+    recurse(min(n // 10, sys.getrecursionlimit() - 100), None)
+
+
+def secret_strings(measure, n):
+    # Half of the strings look like tokens and are checked against
+    # config.secret_patterns
+    secrets = ["A1b2C3d4" * 8 + "x" * 1000 for _ in range(n // 20)]  # noqa: F841
+    texts = [f"line {i} " * 100 for i in range(n // 20)]  # noqa: F841
+    measure()
+
+
+def many_source_files(measure, n):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        count = min(n // 50, sys.getrecursionlimit() // 4)
+        modules = []
+        for i in range(count):
+            path = os.path.join(tmpdir, f"bench_module_{i}.py")
+            with open(path, "w") as f:
+                f.write(f"# module {i}\n" + "x = 1\n" * 200 + "def call(callback):\n    return callback()\n")
+            spec = importlib.util.spec_from_file_location(f"bench_module_{i}", path)
+            assert spec is not None and spec.loader is not None
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules.append(module)
+
+        def chain(i):
+            if i == len(modules):
+                measure()
+            else:
+                modules[i].call(lambda: chain(i + 1))
+        chain(0)
+
+
+def tensors(measure, n):
+    import torch  # type: ignore
+    values = [torch.rand(64, 64) for _ in range(n // 100)]  # noqa: F841
+    measure()
+
+
+WORKLOADS = {
+    "deep_graph": deep_graph,
+    "wide_graph": wide_graph,
+    "many_threads": many_threads,
+    "long_recursion": long_recursion,
+    "secret_strings": secret_strings,
+    "many_source_files": many_source_files,
+}
+
+if importlib.util.find_spec("torch") is not None:
+    WORKLOADS["tensors"] = tensors
+
+
+def measure_operation(func, repeat):
+    """
+    @return:
+        (time, peak_memory, the result of the last run)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+
+def measure_frame(frame, depth, repeat, tmpdir):
+    path = os.path.join(tmpdir, "bench.dump")
+    results = {}
+
+    elapsed, peak, output = measure_operation(lambda: coredumpy.dumps(frame, depth=depth), repeat)
+    results["dumps"] = {"time": elapsed, "peak_memory": peak, "size": len(output)}
+
+    elapsed, peak, _ = measure_operation(lambda: coredumpy.dump(frame, depth=depth, path=path), repeat)
+    results["dump"] = {"time": elapsed, "peak_memory": peak, "size": os.path.getsize(path)}
+
+    def load():
+        data = load_data_from_path(path)
+        data["container"].clear()
+
+    elapsed, peak, _ = measure_operation(load, repeat)
+    results["load_data_from_path"] = {"time": elapsed, "peak_memory": peak}
+
+    def peek_quietly():
+        with contextlib.redirect_stdout(io.StringIO()):
+            peek(path)
+
+    elapsed, peak, _ = measure_operation(peek_quietly, repeat)
+    results["peek"] = {"time": elapsed, "peak_memory": peak}
+    return results
+
+
+def run_workload(name, n, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        def measure(depth=None):
+            results.update(measure_frame(sys._getframe(1), depth, repeat, tmpdir))
+        WORKLOADS[name](measure, n)
+    return results
+
+
+def compare(results, baseline, threshold, time_threshold=None, min_time=0.0):
+    """
+    @param time_threshold:
+        The threshold of the times, which are not compared if it's None
+    @param min_time:
+        The time differences below this are noise and never regressions
+    @return:
+        The list of the regressions, as (workload, operation, metric, baseline, current)
+    """
+    regressions = []
+    for workload, operations in results.items():
+        for operation, metrics in operations.items():
+            base_metrics = baseline.get(workload, {}).get(operation, {})
+            for metric, value in metrics.items():
+                base = base_metrics.get(metric)
+                if not base:
+                    continue
+                if metric == "time":
+                    if time_threshold is None or value - base < min_time:
+                        continue
+                    limit = base * (1 + time_threshold)
+                else:
+                    limit = base * (1 + threshold)
+                if value > limit:
+                    regressions.append((workload, operation, metric, base, value))
+    return regressions
+
+
+def format_value(metric, value):
+    if metric == "time":
+        return f"{value * 1000:.2f}ms"
+    return f"{value / 1024:.1f}KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS),
+                        help="The workload to run, all of them if not specified")
+    parser.add_argument("--scale", type=float, default=1.0, help="The multiplier of the workload sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of the timed runs of each operation")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", default=None,
+                        help=f"Compare the results against this JSON file, {BASELINE_PATH} if it exists")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="The ratio over the baseline of the size or the peak memory that counts as a regression")
+    parser.add_argument("--compare-time", action="store_true",
+                        help="Compare the times too, only meaningful against a baseline from the same machine")
+    parser.add_argument("--time-threshold", type=float, default=1.0,
+                        help="The ratio over the baseline of the time that counts as a regression")
+    parser.add_argument("--min-time", type=float, default=0.002,
+                        help="The time difference in seconds below which a slowdown is ignored")
+    args = parser.parse_args()
+
+    n = int(10000 * args.scale)
+    results = {}
+    for name in args.workload or WORKLOADS:
+        results[name] = run_workload(name, n, args.repeat)
+        for operation, metrics in results[name].items():
+            values = "  ".join(f"{metric}={format_value(metric, value):>12}" for metric, value in metrics.items())
+            print(f"{name:>18} {operation:<20} {values}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "python_version": platform.python_version(),
+                "coredumpy_version": coredumpy.__version__,
+                "scale": args.scale,
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+
+    baseline_path = args.baseline
+    if baseline_path is None and os.path.exists(BASELINE_PATH):
+        baseline_path = BASELINE_PATH
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"Not compared, the baseline is of scale {baseline.get('scale')}, not {args.scale}")
+            return
+        regressions = compare(results, baseline["results"], args.threshold,
+                              args.time_threshold if args.compare_time else None, args.min_time)
+        for workload, operation, metric, base, value in regressions:
+            print(f"Regression: {workload} {operation} {metric} "
+                  f"{format_value(metric, base)} -> {format_value(metric, value)} ({value / base - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
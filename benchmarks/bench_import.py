@@ -0,0 +1,83 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+"""
+The time of `import coredumpy` in a fresh interpreter
+
+Every process that enables coredumpy pays for the import, so the heavy
+modules are only imported on the first dump or load. This measures the
+median import time of --runs fresh interpreters and fails if it's over
+--budget milliseconds, or if any of the deferred modules is imported.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --budget 20 --runs 50
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+# The modules that should not be imported by `import coredumpy`
+DEFERRED_MODULES = (
+    "argparse",
+    "coredumpy.coredumpy",
+    "coredumpy.main",
+    "coredumpy.pytest_hook",
+    "coredumpy.types.torch_types",
+    "coredumpy.unittest_hook",
+    "gzip",
+    "inspect",
+    "json",
+    "platform",
+    "sqlite3",
+    "tokenize",
+    "typing",
+    "unittest",
+)
+
+SCRIPT = """
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import coredumpy
+elapsed = time.perf_counter() - start
+print(json.dumps({"time": elapsed, "modules": sorted(set(sys.modules) - before)}))
+"""
+
+
+def measure_once():
+    output = subprocess.check_output([sys.executable, "-c", SCRIPT])
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="The number of fresh interpreters to measure")
+    parser.add_argument("--budget", type=float, default=20.0, help="The budget of the median import time in ms")
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    times = sorted(result["time"] * 1000 for result in results)
+    median = statistics.median(times)
+    imported = results[-1]["modules"]
+    deferred = [module for module in DEFERRED_MODULES if module in imported]
+
+    print(f"import coredumpy: median {median:.2f}ms, min {times[0]:.2f}ms, max {times[-1]:.2f}ms, "
+          f"{len(imported)} modules imported")
+
+    failed = False
+    if median > args.budget:
+        print(f"Over the budget of {args.budget:.2f}ms")
+        failed = True
+    if deferred:
+        print(f"Deferred modules imported: {', '.join(deferred)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
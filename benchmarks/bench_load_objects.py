@@ -0,0 +1,76 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+"""
+Worst case workloads for PyObjectContainer.load_objects
+
+Immutable containers can't be built before their items, so long chains of
+nested tuples and frozensets are the worst case for the object resolver.
+
+    python benchmarks/bench_load_objects.py [size ...]
+"""
+
+import sys
+import time
+
+from coredumpy.py_object_container import PyObjectContainer
+
+
+def tuple_chain(n):
+    obj: tuple = ()
+    for _ in range(n):
+        obj = (obj,)
+    return obj
+
+
+def frozenset_chain(n):
+    obj: frozenset = frozenset()
+    for i in range(n):
+        obj = frozenset([obj, i])
+    return obj
+
+
+def wide_tuple(n):
+    return tuple((i, str(i)) for i in range(n))
+
+
+def cyclic_lists(n):
+    lst: list = []
+    for _ in range(n):
+        lst = [lst, (lst,)]
+        lst.append(lst)
+    return lst
+
+
+WORKLOADS = {
+    "tuple_chain": tuple_chain,
+    "frozenset_chain": frozenset_chain,
+    "wide_tuple": wide_tuple,
+    "cyclic_lists": cyclic_lists,
+}
+
+
+def bench(name, n):
+    obj = WORKLOADS[name](n)
+    container = PyObjectContainer()
+    container.add_object(obj, depth=n + 2)
+    objects = container.get_objects().copy()
+    container.clear()
+    loader = PyObjectContainer()
+    start = time.perf_counter()
+    loader.load_objects(objects)
+    elapsed = time.perf_counter() - start
+    loader.clear()
+    return len(objects), elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 4000]
+    for name in WORKLOADS:
+        for n in sizes:
+            count, elapsed = bench(name, n)
+            print(f"{name:>16} n={n:<8} objects={count:<8} {elapsed * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,57 @@
 
 __version__ = "0.5.0"
 
-import coredumpy.pytest_hook as pytest_hook
+import importlib
+
 from .config import config
-from .coredumpy import Coredumpy, dump, dumps, load
-from .except_hook import patch_except
-from .main import main
-from .pytest_hook import patch_pytest
-from .type_support import TypeSupportBase, TypeSupportContainerBase, NotReady
-from .unittest_hook import patch_unittest
 from .conf_hook import startup_conf
-from .types import builtin_types, torch_types  # noqa: F401
+
+# typing is not imported to save the import time
+TYPE_CHECKING = False
+if TYPE_CHECKING:  # pragma: no cover
+    from . import pytest_hook
+    from .coredumpy import Coredumpy, dump, dumps, load
+    from .except_hook import patch_except
+    from .main import main
+    from .pytest_hook import patch_pytest
+    from .type_support import TypeSupportBase, TypeSupportContainerBase, NotReady
+    from .unittest_hook import patch_unittest
+
+
+# The attributes are imported on the first access, so importing coredumpy
+# does not import the dump machinery, argparse, unittest etc.
+# attribute -> the module to import it from, the module itself if None
+_lazy_attributes = {
+    "Coredumpy": ".coredumpy",
+    "dump": ".coredumpy",
+    "dumps": ".coredumpy",
+    "load": ".coredumpy",
+    "main": ".main",
+    "patch_except": ".except_hook",
+    "patch_pytest": ".pytest_hook",
+    "patch_unittest": ".unittest_hook",
+    "pytest_hook": None,
+    "TypeSupportBase": ".type_support",
+    "TypeSupportContainerBase": ".type_support",
+    "NotReady": ".type_support",
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _lazy_attributes[name]
+    if module_name is None:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
 
 startup_conf()
 
@@ -2,7 +2,7 @@
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
 
-from .main import main
+from coredumpy import main
 
 
 if __name__ == '__main__':
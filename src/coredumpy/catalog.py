@@ -0,0 +1,190 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import contextlib
+import datetime
+import os
+import sqlite3
+from typing import Optional
+
+from .policy import INTERNAL_FILE_PREFIX
+from .summary_index import load_headers
+
+
+CATALOG_FILENAME = f"{INTERNAL_FILE_PREFIX}catalog.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dumps (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    valid INTEGER NOT NULL,
+    version TEXT,
+    python_version TEXT,
+    dump_time TEXT,
+    system TEXT,
+    node TEXT,
+    release TEXT,
+    exception TEXT,
+    function TEXT,
+    filename TEXT,
+    lineno INTEGER,
+    thread_count INTEGER,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS dumps_dump_time ON dumps (dump_time);
+CREATE INDEX IF NOT EXISTS dumps_node ON dumps (node);
+CREATE INDEX IF NOT EXISTS dumps_exception ON dumps (exception);
+CREATE INDEX IF NOT EXISTS dumps_function ON dumps (function);
+"""
+
+_COLUMNS = (
+    "path", "mtime_ns", "size", "valid", "version", "python_version", "dump_time", "system",
+    "node", "release", "exception", "function", "filename", "lineno", "thread_count", "description"
+)
+
+
+def get_catalog_path(directory: str, catalog: Optional[str] = None) -> str:
+    if catalog is not None:
+        return os.path.abspath(catalog)
+    return os.path.join(os.path.abspath(directory), CATALOG_FILENAME)
+
+
+def _connect(catalog_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(catalog_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _header_to_row(path: str, mtime_ns: int, size: int, header: Optional[dict]) -> tuple:
+    if header is None:
+        return (path, mtime_ns, size, 0) + (None,) * (len(_COLUMNS) - 4)
+    metadata = header.get("metadata") or {}
+    system = metadata.get("system") or {}
+    frame = header.get("frame") or {}
+    return (
+        path, mtime_ns, size, 1,
+        metadata.get("version"),
+        metadata.get("python_version"),
+        metadata.get("dump_time"),
+        system.get("system"),
+        system.get("node"),
+        system.get("release"),
+        header.get("exception"),
+        frame.get("name"),
+        frame.get("filename"),
+        frame.get("lineno"),
+        header.get("thread_count"),
+        header.get("description"),
+    )
+
+
+def update_catalog(directory: str, catalog: Optional[str] = None, jobs: Optional[int] = None) -> tuple[int, int]:
+    """
+    Build or update the catalog of the dumps in a directory, recursively.
+    Only the new or changed files are read.
+
+    @return:
+        The number of files read and the number of entries removed
+    """
+    catalog_path = get_catalog_path(directory, catalog)
+    with contextlib.closing(_connect(catalog_path)) as conn:
+        known = {row["path"]: (row["mtime_ns"], row["size"])
+                 for row in conn.execute("SELECT path, mtime_ns, size FROM dumps")}
+
+        seen = set()
+        new_files = []
+        for root, _, filenames in os.walk(os.path.abspath(directory)):
+            for filename in filenames:
+                if filename.startswith(INTERNAL_FILE_PREFIX):
+                    continue
+                path = os.path.join(root, filename)
+                if path == catalog_path:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:  # pragma: no cover
+                    continue
+                seen.add(path)
+                if known.get(path) != (stat.st_mtime_ns, stat.st_size):
+                    new_files.append((path, stat.st_mtime_ns, stat.st_size))
+
+        headers = load_headers([path for path, _, _ in new_files], jobs=jobs)
+        removed = [(path,) for path in known if path not in seen]
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO dumps ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [_header_to_row(path, mtime_ns, size, header)
+                 for (path, mtime_ns, size), header in zip(new_files, headers)]
+            )
+            conn.executemany("DELETE FROM dumps WHERE path = ?", removed)
+
+    return len(new_files), len(removed)
+
+
+def _end_of_day(until: str) -> str:
+    """
+    "2024-01-01" should include the whole day, the dump times are in seconds
+    """
+    try:
+        datetime.datetime.strptime(until, "%Y-%m-%d")
+    except ValueError:
+        return until
+    return f"{until} 23:59:59"
+
+
+def query_catalog(directory: str,
+                  catalog: Optional[str] = None,
+                  *,
+                  host: Optional[str] = None,
+                  exception: Optional[str] = None,
+                  function: Optional[str] = None,
+                  filename: Optional[str] = None,
+                  since: Optional[str] = None,
+                  until: Optional[str] = None,
+                  limit: Optional[int] = None) -> list[dict]:
+    """
+    Query the dumps in the catalog, the newest first
+
+    @param host:
+        The node name of the machine that created the dump
+    @param exception:
+        The type name of the exception, like KeyError
+    @param function:
+        The name of the function of the top frame
+    @param filename:
+        A substring of the file name of the top frame
+    @param since:
+        The earliest dump time, like "2024-01-01" or "2024-01-01 12:00:00"
+    @param until:
+        The latest dump time, in the same format as since
+    @param limit:
+        The maximum number of results
+    """
+    catalog_path = get_catalog_path(directory, catalog)
+    if not os.path.exists(catalog_path):
+        raise FileNotFoundError(catalog_path)
+
+    conditions = ["valid = 1"]
+    params: list = []
+    for column, value in (("node", host), ("exception", exception), ("function", function)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if filename is not None:
+        conditions.append("filename LIKE ?")
+        params.append(f"%{filename}%")
+    if since is not None:
+        conditions.append("dump_time >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("dump_time <= ?")
+        params.append(_end_of_day(until))
+    query = f"SELECT * FROM dumps WHERE {' AND '.join(conditions)} ORDER BY dump_time DESC, path"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with contextlib.closing(_connect(catalog_path)) as conn:
+        return [dict(row) for row in conn.execute(query, params)]
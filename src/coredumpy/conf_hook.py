@@ -2,10 +2,10 @@
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
 import os
-import runpy
 
 
 def startup_conf():
     cwd = os.getcwd()
     if os.path.exists(os.path.join(cwd, "conf_coredumpy.py")):
+        import runpy
         runpy.run_path(os.path.join(cwd, "conf_coredumpy.py"))
@@ -4,8 +4,8 @@
 import contextlib
 import os
 import re
+from collections.abc import Callable
 from types import GenericAlias
-from typing import Callable
 
 
 class _Config:
@@ -16,6 +16,17 @@ class _Config:
     secret_patterns: list[re.Pattern]
     hide_environ: bool
     environ_filter: Callable
+    tensor_summary_threshold: int
+    dedup_window: int
+    dump_rate_limit: int
+    dump_rate_period: int
+    dump_dir_quota: int
+    dump_asyncio_tasks: bool
+    asyncio_task_limit: int
+    asyncio_task_depth: int
+    collapse_recursion: int
+    profile_dump: bool
+    dump_callbacks: list[Callable]
 
     def __init__(self) -> None:
         self.default_recursion_depth = 10
@@ -28,6 +39,18 @@ class _Config:
         self.hide_environ = True
         self._environ_values: set[str] = set()
         self.environ_filter = lambda env: len(env) > 8
+        self.tensor_summary_threshold = 0
+        self.dedup_window = 0
+        self.dump_rate_limit = 0
+        self.dump_rate_period = 60
+        self.dump_dir_quota = 0
+        self.dump_asyncio_tasks = False
+        self.asyncio_task_limit = 1000
+        self.asyncio_task_depth = 1
+        self.collapse_recursion = 0
+        self.profile_dump = False
+        self.dump_callbacks = []
+        self._redaction_count = 0
 
     def __setattr__(self, name: str, value: object) -> None:
         annotated_type = type(self).__annotations__.get(name)
@@ -45,6 +68,17 @@ class _Config:
     def environ_values(self) -> set[str]:
         return self._environ_values
 
+    @property
+    def redaction_count(self) -> int:
+        """
+        The number of strings hidden by hide_secret or hide_environ since the
+        start of the process
+        """
+        return self._redaction_count
+
+    def record_redaction(self) -> None:
+        self._redaction_count += 1
+
     @contextlib.contextmanager
     def dump_context(self):
         if self.hide_environ:
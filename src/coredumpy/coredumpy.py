@@ -5,12 +5,14 @@
 import datetime
 import gzip
 import inspect
+import io
 import json
 import linecache
 import os
 import platform
 import sys
 import threading
+import time
 import tokenize
 import textwrap
 import types
@@ -18,11 +20,21 @@ from types import CodeType, FrameType
 from typing import Callable, Literal, Optional, Union
 
 from .config import config
+from .metrics import DumpMetrics, report_metrics
 from .patch import patch_all
+from .policy import enforce_quota, get_crash_signature, rate_limiter, record_dump, record_duplicate
 from .py_object_container import PyObjectContainer
+from .py_object_proxy import PyObjectProxy
 from .utils import get_dump_filename
 
 
+# The size of the chunks of the body to compress
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+# The longest cycle of frames that is detected as a recursion, like f -> g -> f
+MAX_RECURSION_PERIOD = 8
+
+
 class _ExecutableTarget:
     filename: str
     code: Union[CodeType, str]
@@ -102,6 +114,77 @@ class _ModuleTarget(_ExecutableTarget):
         )
 
 
+def _get_coroutine_frames(coro) -> list[FrameType]:
+    """
+    Get the frames of a coroutine chain, from the outermost to the innermost
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def _get_task_stacks(limit: int) -> list[tuple[int, str, list[FrameType]]]:
+    """
+    Get (id, name, frames) of the pending asyncio tasks of the running loop,
+    except the current task, whose frames are already in the thread.
+    """
+    # Do not import asyncio if it is not used at all
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return []
+    try:
+        tasks = asyncio.all_tasks()
+    except RuntimeError:
+        # No running event loop
+        return []
+    current_task = asyncio.current_task()
+    stacks: list[tuple[int, str, list[FrameType]]] = []
+    for task in tasks:
+        if len(stacks) >= limit:
+            break
+        if task is current_task or task.done():
+            continue
+        frames = _get_coroutine_frames(task.get_coro())
+        if frames:
+            stacks.append((id(task), f"Task {task.get_name()}", frames))
+    return stacks
+
+
+def _find_recursions(frames: list[FrameType], keep: int) -> list[tuple[int, int, int]]:
+    """
+    Find the cycles of (code, lineno) in the stack that repeat more than
+    2 * keep + 1 times.
+
+    @param frames:
+        The frames of the stack, from the top
+    @param keep:
+        The number of repetitions to keep at both ends of a cycle, at least 1
+    @return:
+        A list of (start, end, period), frames[start:end] can be collapsed
+    """
+    keys = [(f.f_code, f.f_lineno) for f in frames]
+    recursions = []
+    i = 0
+    while i < len(keys):
+        for period in range(1, MAX_RECURSION_PERIOD + 1):
+            j = i
+            while j + period < len(keys) and keys[j] == keys[j + period]:
+                j += 1
+            repeats = (j - i) // period + 1
+            if repeats > 2 * keep + 1:
+                recursions.append((i + keep * period, i + (repeats - keep) * period, period))
+                i += repeats * period
+                break
+        else:
+            i += 1
+    return recursions
+
+
 class Coredumpy:
     @classmethod
     def dump(cls,
@@ -110,7 +193,8 @@ class Coredumpy:
              description: Optional[str] = None,
              depth: Optional[int] = None,
              path: Optional[Union[str, Callable[[], str]]] = None,
-             directory: Optional[str] = None):
+             directory: Optional[str] = None,
+             exception: Optional[BaseException] = None) -> Optional[str]:
         """
         dump the current frame stack to a file
 
@@ -125,8 +209,12 @@ class Coredumpy:
             if not specified, the default filename will be used
         @param directory:
             The directory to save the dump file, only works when path is not specified.
+        @param exception:
+            The exception that triggered the dump, its type will be saved in the dump file.
+            If config.dedup_window is set, the same crash within the window will not be dumped again
         @return:
-            The path of the dump file
+            The path of the dump file, or the path of the previous dump for a duplicate crash.
+            None if the dump is skipped because of config.dump_rate_limit
         """
         if frame is None:
             inner_frame = inspect.currentframe()
@@ -134,16 +222,65 @@ class Coredumpy:
             frame = inner_frame.f_back
 
         output_file = get_dump_filename(frame, path, directory)
+        output_dir = os.path.dirname(output_file)
 
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+
+        metrics = DumpMetrics(exception)
+
+        signature = None
+        if config.dedup_window and exception is not None:
+            # The signature does not need the traversal, so a repeated crash
+            # only costs a counter update
+            signature = get_crash_signature(exception, frame)
+            duplicate = record_duplicate(output_dir, signature, config.dedup_window)
+            if duplicate is not None:
+                metrics.path = duplicate
+                metrics.skipped = "duplicate"
+                report_metrics(metrics)
+                return duplicate
+
+        if config.dump_rate_limit and not rate_limiter.acquire(config.dump_rate_limit, config.dump_rate_period):
+            metrics.skipped = "rate_limit"
+            report_metrics(metrics)
+            return None
+
+        header, body = cls._dumps(frame, description=description, depth=depth, exception=exception,
+                                  suppressed=rate_limiter.pop_suppressed(), metrics=metrics)
 
         if output_file.endswith(".json"):
-            file_open = open
+            with metrics.measure("write"):
+                with open(output_file, "wt") as f:
+                    f.write(header + "\n" + body)
         else:
-            file_open = gzip.open  # type: ignore
-
-        with file_open(output_file, "wt") as f:
-            f.write(cls.dumps(frame, description=description, depth=depth))
+            with metrics.measure("compress"):
+                # The header is a separate gzip member so it can be read
+                # without decompressing the objects
+                compressed = io.BytesIO(gzip.compress((header + "\n").encode()))
+                compressed.seek(0, io.SEEK_END)
+                with gzip.GzipFile(fileobj=compressed, mode="wb") as gz:
+                    # The body is ascii only, encode it in chunks to save memory
+                    for i in range(0, len(body), WRITE_CHUNK_SIZE):
+                        gz.write(body[i:i + WRITE_CHUNK_SIZE].encode())
+            with metrics.measure("write"):
+                with open(output_file, "wb") as f:
+                    f.write(compressed.getbuffer())
+
+        metrics.path = output_file
+        metrics.bytes_written = os.path.getsize(output_file)
+
+        if signature is not None:
+            record_dump(output_dir, signature, output_file)
+
+        if config.dump_dir_quota:
+            try:
+                enforce_quota(output_dir, config.dump_dir_quota, keep=output_file)
+            except Exception as e:
+                # The dump is already written, failing to clean up the old
+                # ones should not break it
+                print(f"coredumpy: failed to enforce the quota of {output_dir}: {e!r}", file=sys.stderr)
+
+        report_metrics(metrics)
 
         return output_file
 
@@ -152,7 +289,8 @@ class Coredumpy:
               frame: Optional[types.FrameType] = None,
               *,
               description: Optional[str] = None,
-              depth: Optional[int] = None) -> str:
+              depth: Optional[int] = None,
+              exception: Optional[BaseException] = None) -> str:
         """
         dump the current frame stack to a string
         @param frame:
@@ -161,8 +299,10 @@ class Coredumpy:
             The description of the dump, it will be saved in the dump file
         @param depth:
             The depth of the object search
+        @param exception:
+            The exception that triggered the dump, its type will be saved in the dump file
         @return:
-            The string of the dump
+            The string of the dump, a single json document
         """
         if frame is None:
             inner_frame = inspect.currentframe()
@@ -170,6 +310,39 @@ class Coredumpy:
             frame = inner_frame.f_back
             assert frame is not None
 
+        metrics = DumpMetrics(exception)
+        header, body = cls._dumps(frame, description=description, depth=depth, exception=exception,
+                                  metrics=metrics)
+        # Only the dump files have the header on a separate line, the string
+        # is the header and the body merged in one object, which can be
+        # loaded like the legacy dump files
+        output = header[:-1] + ", " + body[1:]
+        metrics.bytes_written = len(output)
+        report_metrics(metrics)
+        return output
+
+    @classmethod
+    def _dumps(cls,
+               frame: Optional[types.FrameType],
+               *,
+               description: Optional[str] = None,
+               depth: Optional[int] = None,
+               exception: Optional[BaseException] = None,
+               suppressed: int = 0,
+               metrics: Optional[DumpMetrics] = None) -> tuple[str, str]:
+        """
+        dump the frame stack to a header and a body string. The header is a
+        single line with the metadata and the description, so it can be read
+        without parsing the body. suppressed is the number of dumps skipped
+        by the rate limit before this one. The time of each phase and the
+        counts are recorded in metrics.
+        """
+        assert frame is not None
+
+        if metrics is None:
+            metrics = DumpMetrics(exception)
+
+        top_frame = frame
         container = PyObjectContainer()
 
         # The intuitive minimum depth is 1, but we start the count from the
@@ -196,76 +369,183 @@ class Coredumpy:
 
         threads = {}
         thread_names = {}
-        all_frames = set()
+        stacks = []
         current_thread = None
-        if config.dump_all_threads:
-            for thread in threading.enumerate():
-                thread_names[thread.ident] = thread.name
-
-            for thread_id, f in sys._current_frames().items():
-                frames: list[FrameType]
+        # (marker frame, the first kept frame before it, the first kept frame after it, number of frames)
+        collapsed: list[tuple[FrameType, FrameType, FrameType, int]] = []
+        collapsed_ids: set[str] = set()
+        task_stacks: list[tuple[int, str, list[FrameType]]] = []
+        with metrics.measure("frame_walk"):
+            if config.dump_all_threads:
+                for thread in threading.enumerate():
+                    thread_names[thread.ident] = thread.name
+
+                for thread_id, f in sys._current_frames().items():
+                    frames: list[FrameType]
+                    frames = []
+                    threads[thread_id] = f
+                    while f:
+                        if f == frame:
+                            # This is the specified frame
+                            threads[thread_id] = f
+                            frames = []
+                            current_thread = thread_id
+                        frames.append(f)
+                        f = f.f_back  # type: ignore
+                    stacks.append(frames)
+
+            if current_thread is None:
+                # We dumped some frame that's not in any thread, make up one
+                threads[0] = frame
+                current_thread = 0
                 frames = []
-                threads[thread_id] = f
-                while f:
-                    if f == frame:
-                        # This is the specified frame
-                        threads[thread_id] = f
-                        frames = []
-                        current_thread = thread_id
-                    frames.append(f)
+                while frame:
+                    frames.append(frame)
+                    frame = frame.f_back
+                stacks.append(frames)
+
+            if config.collapse_recursion > 0:
+                for frames in stacks:
+                    for start, end, period in _find_recursions(frames, config.collapse_recursion):
+                        collapsed.append((frames[start], frames[start - period], frames[end], end - start))
+                        collapsed_ids.update(str(id(f)) for f in frames[start:end])
+
+            if config.dump_asyncio_tasks:
+                task_stacks = _get_task_stacks(config.asyncio_task_limit)
+
+        with metrics.measure("source_capture"):
+            for frames in stacks:
+                for f in frames:
+                    add_file(f)
+            for _, _, frames in task_stacks:
+                for f in frames:
                     add_file(f)
-                    f = f.f_back  # type: ignore
-                all_frames.update(frames)
-
-        if current_thread is None:
-            # We dumped some frame that's not in any thread, make up one
-            threads[0] = frame
-            current_thread = 0
-            while frame:
-                all_frames.add(frame)
-                add_file(frame)
-                frame = frame.f_back
-
-        container.add_objects(all_frames, depth)
 
-        ret = json.dumps({
-            "objects": container.get_objects(),
-            "threads": {
-                str(thread_id): {
-                    "frame": str(id(f)),
-                    "name": thread_names.get(thread_id, f"{thread_id}")
-                }
-                for thread_id, f in threads.items()
-            },
-            "current_thread": str(current_thread),
-            "files": {file: lines for file, lines in files.items() if lines is not None},
+        all_frames = {f for frames in stacks for f in frames if str(id(f)) not in collapsed_ids}
+
+        traverse_start = time.perf_counter()
+        container.add_objects(all_frames, depth, exclude=collapsed_ids)
+
+        task_frame_links: list[tuple[FrameType, FrameType]] = []
+        if task_stacks:
+            task_frames = set()
+            for task_id, name, frames in task_stacks:
+                # The innermost coroutine is the top of the pseudo thread
+                threads[task_id] = frames[-1]
+                thread_names[task_id] = name
+                task_frames.update(frames)
+                task_frame_links.extend(zip(frames[1:], frames))
+            # Idle tasks are usually not interesting, dump them shallowly
+            container.add_objects(task_frames - all_frames, config.asyncio_task_depth + 2)
+
+        # The first collapsed frame is replaced by a marker frame, which is a
+        # copy of the same frame in the previous repetition with a new name
+        # and no local variables, and links to the rest of the stack
+        markers = {}
+        for f, same_frame, f_back, count in collapsed:
+            code = f.f_code.replace(co_name=f"<{count} repeated frames collapsed>")
+            f_locals: dict = {}
+            container.add_objects([code, f_locals], 2)
+            attrs = dict(container.get_objects()[str(id(same_frame))]["attrs"])
+            attrs.update(f_code=str(id(code)), f_locals=str(id(f_locals)), f_back=str(id(f_back)))
+            markers[str(id(f))] = {"type": "frame", "attrs": attrs}
+
+        objects = container.get_objects()
+        objects.update(markers)
+        traverse_time = time.perf_counter() - traverse_start
+        metrics.phases["traversal"] = traverse_time
+        metrics.object_count = len(objects)
+        metrics.timed_out = container.timed_out
+        metrics.redaction_count = container.redaction_count
+        # A suspended coroutine frame has no f_back, link it to the frame
+        # of the coroutine that awaits it
+        for f, f_back in task_frame_links:
+            data = objects[str(id(f))]
+            if "attrs" in data:
+                data["attrs"]["f_back"] = str(id(f_back))
+
+        header_data = {
             "description": description,
-            "metadata": cls.get_metadata()
-        })
+            "metadata": {**cls.get_metadata(), "suppressed_dumps": suppressed},
+            "exception": type(exception).__qualname__ if exception is not None else None,
+            "frame": {
+                "name": top_frame.f_code.co_name,
+                "filename": top_frame.f_code.co_filename,
+                "lineno": top_frame.f_lineno,
+            },
+            "thread_count": len(threads),
+            "task_count": len(task_stacks),
+            "collapsed_frame_count": sum(count for _, _, _, count in collapsed),
+        }
+        if config.profile_dump:
+            header_data["profile"] = {
+                "object_count": len(objects),
+                "time": traverse_time,
+                "types": container.get_stats(),
+            }
+        with metrics.measure("encode"):
+            header = json.dumps(header_data)
+            body = json.dumps({
+                "objects": objects,
+                "threads": {
+                    str(thread_id): {
+                        "frame": str(id(f)),
+                        "name": thread_names.get(thread_id, f"{thread_id}")
+                    }
+                    for thread_id, f in threads.items()
+                },
+                "current_thread": str(current_thread),
+                "files": {file: lines for file, lines in files.items() if lines is not None},
+                "collapsed_frames": list(markers),
+            })
 
         container.clear()
 
-        return ret
+        return header, body
 
     @classmethod
-    def load_data_from_path(cls, path: str):
+    def _open(cls, path: str):
         if path.endswith(".json"):
-            file_open = open
-        else:
-            file_open = gzip.open  # type: ignore
-
-        with file_open(path, "rt") as f:
-            data = json.load(f)
+            return open(path, "rt")
+        return gzip.open(path, "rt")
 
+    @classmethod
+    def _check_version(cls, header: dict):
         from coredumpy import __version__
-        if data["metadata"]["version"] != __version__:  # pragma: no cover
-            print(f"Warning! the dump file is created by {data['metadata']['version']}\n"
+        if header["metadata"]["version"] != __version__:  # pragma: no cover
+            print(f"Warning! the dump file is created by {header['metadata']['version']}\n"
                   f"but the current coredumpy version is {__version__}")
 
+    @classmethod
+    def load_header_from_path(cls, path: str) -> dict:
+        """
+        load the metadata and the description of a dump without the objects
+        """
+        with cls._open(path) as f:
+            # Legacy dumps are a single json document, which is read as a whole
+            return json.loads(f.readline())
+
+    @classmethod
+    def load_data_from_path(cls, path: str, progress: Optional[Callable[[int, int], None]] = None):
+        """
+        load the dump and rebuild the objects
+
+        @param progress:
+            Called with (loaded, total) periodically while the objects are
+            rebuilt, see PyObjectContainer.load_objects
+        """
+        with cls._open(path) as f:
+            data = json.loads(f.readline())
+            if "objects" not in data:
+                # The first line is the header, the rest is the body
+                data.update(json.loads(f.read()))
+
+        cls._check_version(data)
+
         patch_all()
 
         container = PyObjectContainer()
-        container.load_objects(data["objects"])
+        container.load_objects(data["objects"], progress=progress)
 
         for thread in data["threads"]:
             data["threads"][thread]["frame"] = container.get_object(data["threads"][thread]["frame"])
@@ -275,9 +555,12 @@ class Coredumpy:
         # an arbitrary code execution
         for thread in data["threads"]:
             frame = data["threads"][thread]["frame"]
-            while frame:
-                frame.f_globals.pop("__loader__", None)
-                frame.f_globals.pop("__spec__", None)
+            # The attributes of the frames are unknown if the dump was
+            # stopped early by the timeout
+            while isinstance(frame, PyObjectProxy):
+                if isinstance(frame.f_globals, dict):
+                    frame.f_globals.pop("__loader__", None)
+                    frame.f_globals.pop("__spec__", None)
                 frame = frame.f_back
 
         return {
@@ -285,7 +568,8 @@ class Coredumpy:
             "threads": data["threads"],
             "current_thread": data["current_thread"],
             "frame": data["threads"][data["current_thread"]]["frame"],
-            "files": data["files"]
+            "files": data["files"],
+            "collapsed_frames": set(data.get("collapsed_frames", ())),
         }
 
     @classmethod
@@ -311,26 +595,44 @@ class Coredumpy:
 
     @classmethod
     def peek(cls, path: str):
-        if path.endswith(".json"):
-            file_open = open
-        else:
-            file_open = gzip.open  # type: ignore
-
-        with file_open(path, "rt") as f:
-            data = json.load(f)
+        cls.print_summary(path, cls.load_header_from_path(path))
 
-        from coredumpy import __version__
-        if data["metadata"]["version"] != __version__:  # pragma: no cover
-            print(f"Warning! the dump file is created by {data['metadata']['version']}\n"
-                  f"but the current coredumpy version is {__version__}")
-        patch_all()
-        metadata = data["metadata"]
+    @classmethod
+    def print_summary(cls, path: str, header: dict):
+        cls._check_version(header)
+        metadata = header["metadata"]
         system = metadata["system"]
         print(f"{os.path.abspath(path)}")
         print(f"    Python v{metadata['python_version']} on {system['system']} {system['node']} {system['release']}")
         print(f"    {metadata['dump_time']}")
-        if data["description"]:
-            print(textwrap.indent(data["description"], "    "))
+        if metadata.get("suppressed_dumps"):
+            print(f"    {metadata['suppressed_dumps']} dumps skipped by the rate limit before this one")
+        if header.get("collapsed_frame_count"):
+            print(f"    {header['collapsed_frame_count']} repeated frames of recursion collapsed")
+        if header["description"]:
+            print(textwrap.indent(header["description"], "    "))
+
+    @classmethod
+    def stats(cls, path: str, top: int = 20, sort: Literal["time", "bytes", "count"] = "time"):
+        """
+        print the types that take the most time or space in the dump, which
+        are only saved with config.profile_dump
+        """
+        header = cls.load_header_from_path(path)
+        print(f"{os.path.abspath(path)}")
+        profile = header.get("profile")
+        if profile is None:
+            print("    No profile in the dump, set coredumpy.config.profile_dump = True to collect it")
+            return
+        types = profile["types"]
+        total_time = sum(stats["time"] for stats in types.values()) or 1
+        total_bytes = sum(stats["bytes"] for stats in types.values()) or 1
+        print(f"    {profile['object_count']} objects traversed in {profile['time']:.3f}s")
+        print(f"    {'type':<40} {'count':>10} {'time(ms)':>10} {'time%':>6} {'size(KB)':>10} {'size%':>6}")
+        for name, stats in sorted(types.items(), key=lambda item: item[1][sort], reverse=True)[:top]:
+            print(f"    {name:<40} {stats['count']:>10} {stats['time'] * 1000:>10.1f} "
+                  f"{stats['time'] * 100 / total_time:>6.1f} {stats['bytes'] / 1024:>10.1f} "
+                  f"{stats['bytes'] * 100 / total_bytes:>6.1f}")
 
     @classmethod
     def run(cls, options, args):
@@ -364,9 +666,15 @@ class Coredumpy:
         exec(cmd, __main__.__dict__, __main__.__dict__)
 
     @classmethod
-    def host(cls):
+    def host(cls,
+             port: int = 6742,
+             unix_socket: Optional[str] = None,
+             verbose: bool = False,
+             cache_size: int = 512 * 1024 * 1024,
+             eval_timeout: Optional[float] = 10.0):
         from .dap_server import run_server
-        run_server()
+        run_server(port=port, unix_socket=unix_socket, verbose=verbose, cache_size=cache_size,
+                   eval_timeout=eval_timeout)
 
     @classmethod
     def get_metadata(cls):
@@ -388,6 +696,9 @@ dump = Coredumpy.dump
 dumps = Coredumpy.dumps
 load = Coredumpy.load
 load_data_from_path = Coredumpy.load_data_from_path
+load_header_from_path = Coredumpy.load_header_from_path
 peek = Coredumpy.peek
+print_summary = Coredumpy.print_summary
+stats = Coredumpy.stats
 run = Coredumpy.run
 host = Coredumpy.host
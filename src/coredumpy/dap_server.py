@@ -1,16 +1,19 @@
 # Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
+import asyncio
+import itertools
 import json
 import os
+import reprlib
 import signal
-import socket
 import sys
 import threading
+import time
 import traceback
-from collections import namedtuple
+from collections import ChainMap, OrderedDict, deque
 from types import FrameType
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
 from .coredumpy import load_data_from_path
 from .py_object_proxy import PyObjectProxy
@@ -18,128 +21,231 @@ from .py_object_container import PyObjectContainer
 from .type_support import is_container
 
 
+# Containers larger than this are shown as ranges of children
+CHUNK_SIZE = 300
+
+
 class DebugAdapterServer:
-    def __init__(self, host: str = 'localhost', port: int = 6742):
+    def __init__(self,
+                 host: str = 'localhost',
+                 port: int = 6742,
+                 unix_socket: Optional[str] = None,
+                 verbose: bool = False,
+                 cache_size: int = 512 * 1024 * 1024,
+                 eval_timeout: Optional[float] = 10.0):
         self.host = host
         self.port = port
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.unix_socket = unix_socket
+        self.verbose = verbose
+        self.dump_cache = DumpCache(cache_size) if cache_size > 0 else None
+        self.eval_timeout = eval_timeout
         self.running = True
-        self.client_threads: List[DebugAdapterHandler] = []
+        self.handlers: Set[DebugAdapterHandler] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
         sys.stdout.reconfigure(encoding='utf-8')  # type: ignore
 
     def start(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if not self.running:  # pragma: no cover
+            return
         try:
-            self.server.bind((self.host, self.port))
-            self.server.listen(1)
-            print(f"[Server] Debug adapter server successfully bound to {self.host}:{self.port}", flush=True)
+            if self.unix_socket is not None:
+                if os.path.exists(self.unix_socket):
+                    os.remove(self.unix_socket)
+                server = await asyncio.start_unix_server(self.handle_client, path=self.unix_socket)  # type: ignore
+                address = self.unix_socket
+            else:
+                server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address=True)
+                address = f"{self.host}:{self.port}"
+            print(f"[Server] Debug adapter server successfully bound to {address}", flush=True)
             print("[Server] Server socket created and listening for connections", flush=True)
             print("[Server] Press Ctrl+C to exit", flush=True)
         except Exception as e:  # pragma: no cover
             print(f"[Server] Error binding server: {e}", flush=True)
             return
 
-        while self.running:
-            try:
-                self.server.settimeout(0.5)
-                try:
-                    client, addr = self.server.accept()
-                    print(f"[Server] New client connection accepted from {addr}", flush=True)
-                    client_thread = DebugAdapterHandler(self, client)
-                    client_thread.start()
-                    self.client_threads.append(client_thread)
-                    print(f"[Server] Started client handler thread for {addr}", flush=True)
-                except socket.timeout:
-                    self.update_client_threads()
-                    continue
-            except Exception as e:  # pragma: no cover
-                if self.running:
-                    print(f"Error in server loop: {e}")
-                break
-
-        self.shutdown()
-
-    def update_client_threads(self):
-        for client_thread in self.client_threads[:]:
-            if not client_thread.is_alive():
-                self.client_threads.remove(client_thread)
+        async with server:
+            await self._stop_event.wait()
+            for handler in list(self.handlers):
+                handler.close()
+        if self.unix_socket is not None and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        print(f"[Server] New client connection accepted from {writer.get_extra_info('peername')}", flush=True)
+        handler = DebugAdapterHandler(self, reader, writer)
+        self.handlers.add(handler)
+        try:
+            await handler.run()
+        finally:
+            self.handlers.discard(handler)
 
     def shutdown(self):
+        """
+        Stop the server, it's safe to call from any thread or a signal handler
+        """
         self.running = False
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
 
-        for thread in self.client_threads[:]:
-            try:
-                thread.close()
-            except Exception:  # pragma: no cover
-                pass
 
-        try:
-            self.server.close()
-        except Exception:  # pragma: no cover
-            pass
-
-
-class DebugAdapterHandler(threading.Thread):
-    def __init__(self, server: DebugAdapterServer, client: socket.socket):
-        super().__init__(daemon=True)
-        self.client = client
+class DebugAdapterHandler:
+    def __init__(self, server: DebugAdapterServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
         self.running = True
         self.sequence = 1
         self.debugger: Optional[CoredumpyDebugger] = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.supports_progress = False
+        # seq -> the cancel flag of the running long requests
+        self.cancel_events: Dict[int, threading.Event] = {}
 
-    def run(self):
+    async def run(self):
         print("[Client] Client handler started", flush=True)
-        buffer = b""
+        # Requests are processed in order by the worker, the reader only
+        # handles cancel so it can reach a long running request
+        worker = asyncio.create_task(self.process_messages())
         while self.running:
             try:
-                self.client.settimeout(0.5)
-                try:
-                    data = self.client.recv(4096)
-                    if not data:
-                        break
-
-                    buffer += data
-                    while b'\r\n\r\n' in buffer:
-                        header, rest = buffer.split(b'\r\n\r\n', 1)
-                        content_length = 0
-
-                        for line in header.split(b'\r\n'):
-                            if line.startswith(b'Content-Length: '):
-                                content_length = int(line.split(b': ')[1])
-
-                        if len(rest) >= content_length:
-                            content = rest[:content_length]
-                            buffer = rest[content_length:]
-                            self.process_message(json.loads(content.decode("utf-8")))
-                        else:
-                            break
-                except socket.timeout:  # pragma: no cover
-                    continue
+                message = await self.read_message()
+                if message is None:
+                    break
+                if message.get('type') == 'request' and message.get('command') == 'cancel':
+                    self.cancel(message)
+                    await self.writer.drain()
+                else:
+                    self.queue.put_nowait(message)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                break
             except Exception as e:  # pragma: no cover
                 if self.running:
                     print(f"Error handling client: {e}")
                 break
 
+        for event in self.cancel_events.values():
+            event.set()
+        worker.cancel()
+        self.close()
+
+    async def process_messages(self):
+        while self.running:
+            message = await self.queue.get()
+            await self.process_message(message)
+            try:
+                await self.writer.drain()
+            except ConnectionError:  # pragma: no cover
+                break
+        self.close()
+
+    def cancel(self, message: Dict[str, Any]):
+        arguments = message.get('arguments', {})
+        seq = arguments.get('requestId')
+        progress_id = arguments.get('progressId')
+        if isinstance(progress_id, str) and progress_id.startswith('launch-'):
+            try:
+                seq = int(progress_id[len('launch-'):])
+            except ValueError:
+                # Not a progress of ours, nothing to cancel
+                pass
+        if seq in self.cancel_events:
+            self.cancel_events[seq].set()
+        self.send_response(message, {})
+
+    async def run_cancellable(self, seq: int, func, *args):
+        """
+        Run func(*args, cancelled) in a thread, cancelled is set by a cancel
+        request of seq
+        """
+        cancelled = self.cancel_events[seq] = threading.Event()
         try:
-            self.client.close()
-        except Exception:  # pragma: no cover
-            pass
+            return await self.run_in_executor(func, *args, cancelled)
+        finally:
+            del self.cancel_events[seq]
+
+    async def launch(self, debugger: "CoredumpyDebugger", seq: int):
+        """
+        Load the dump in a thread, report the progress to the client if it
+        supports it, and stop loading if the launch is cancelled
+        """
+        loop = asyncio.get_running_loop()
+        progress_id = f"launch-{seq}"
+
+        def start(cancelled: threading.Event):
+            debugger.start(lambda loaded, total: progress(loaded, total, cancelled))
+
+        def progress(loaded: int, total: int, cancelled: threading.Event):
+            if cancelled.is_set():
+                raise RequestCancelled()
+            if self.supports_progress:
+                loop.call_soon_threadsafe(self.send_event, 'progressUpdate', {
+                    'progressId': progress_id,
+                    'message': f"{loaded}/{total} objects",
+                    'percentage': loaded * 100 // max(total, 1),
+                })
+
+        if self.supports_progress:
+            self.send_event('progressStart', {
+                'progressId': progress_id,
+                'title': 'Loading dump',
+                'message': os.path.basename(debugger.path),
+                'requestId': seq,
+                'cancellable': True,
+                'percentage': 0,
+            })
+            await self.writer.drain()
+        try:
+            await self.run_cancellable(seq, start)
+        finally:
+            if self.supports_progress:
+                self.send_event('progressEnd', {'progressId': progress_id})
 
-    def process_message(self, message: Dict[str, Any]):
+    async def read_message(self) -> Optional[Dict[str, Any]]:
+        try:
+            header = await self.reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+        content_length = 0
+        for line in header.split(b'\r\n'):
+            if line.startswith(b'Content-Length: '):
+                content_length = int(line.split(b': ')[1])
+        content = await self.reader.readexactly(content_length)
+        return json.loads(content.decode("utf-8"))
+
+    async def run_in_executor(self, func, *args):
+        """
+        Run the blocking work, like loading a dump or evaluating an expression,
+        in a thread so the other sessions are not blocked.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def process_message(self, message: Dict[str, Any]):
         try:
-            print("[Client] Processing message:", message, flush=True)
+            if self.server.verbose:
+                print("[Client] Processing message:", message, flush=True)
             if message.get('type') == 'request':
                 command = message.get('command')
                 if command == 'initialize':
-                    # We don't really support anything
-                    self.send_response(message, {})
+                    self.supports_progress = message.get('arguments', {}).get('supportsProgressReporting', False)
+                    self.send_response(message, {'supportsCancelRequest': True})
                     self.send_event('initialized', {})
                 elif command == 'launch':
                     thread_id = 0
                     program = message.get('arguments', {}).get('program', '')
                     if program:
-                        self.debugger = CoredumpyDebugger(program)
-                        self.debugger.start()
+                        self.debugger = CoredumpyDebugger(program, cache=self.server.dump_cache)
+                        try:
+                            await self.launch(self.debugger, message.get('seq', 0))
+                        except RequestCancelled:
+                            self.debugger = None
+                            self.send_error_response(message, 'cancelled')
+                            return
                         thread_id = int(self.debugger.current_thread)
                     self.send_response(message, {})
                     self.send_event('stopped', {'reason': 'entry', 'threadId': thread_id, 'allThreadsStopped': True})
@@ -150,11 +256,14 @@ class DebugAdapterHandler(threading.Thread):
                         threads = []
                     self.send_response(message, {'threads': threads})
                 elif command == 'stackTrace':
+                    arguments = message.get('arguments', {})
                     if self.debugger:
-                        stack_frames = self.debugger.get_stack_trace(message.get('arguments', {}).get('threadId', 0))
+                        stack_frames, total_frames = self.debugger.get_stack_trace(arguments.get('threadId', 0),
+                                                                                   start_frame=arguments.get('startFrame', 0),
+                                                                                   levels=arguments.get('levels', 0))
                     else:
-                        stack_frames = []
-                    self.send_response(message, {'stackFrames': stack_frames, 'totalFrames': len(stack_frames)})
+                        stack_frames, total_frames = [], 0
+                    self.send_response(message, {'stackFrames': stack_frames, 'totalFrames': total_frames})
                 elif command == 'source':
                     source_reference = message.get('arguments', {}).get('sourceReference', 0)
                     if self.debugger:
@@ -170,9 +279,13 @@ class DebugAdapterHandler(threading.Thread):
                         scopes = []
                     self.send_response(message, {'scopes': scopes})
                 elif command == 'variables':
-                    variables_reference = message.get('arguments', {}).get('variablesReference', 0)
+                    arguments = message.get('arguments', {})
+                    variables_reference = arguments.get('variablesReference', 0)
                     if self.debugger:
-                        variables = self.debugger.get_variables(variables_reference)
+                        variables = self.debugger.get_variables(variables_reference,
+                                                                start=arguments.get('start', 0),
+                                                                count=arguments.get('count', 0),
+                                                                filter=arguments.get('filter'))
                     else:
                         variables = []
                     self.send_response(message, {'variables': variables})
@@ -180,10 +293,15 @@ class DebugAdapterHandler(threading.Thread):
                     frame_id = message.get('arguments', {}).get('frameId', 0)
                     expression = message.get('arguments', {}).get('expression', '')
                     if self.debugger:
-                        result = self.debugger.get_evaluate(frame_id, expression)
+                        try:
+                            result = await self.run_cancellable(message.get('seq', 0), self.debugger.get_evaluate,
+                                                                frame_id, expression, self.server.eval_timeout)
+                        except RequestCancelled:
+                            self.send_error_response(message, 'cancelled')
+                            return
                     else:
-                        result = ""
-                    self.send_response(message, {'result': result, 'variablesReference': 0})
+                        result = {'result': '', 'variablesReference': 0}
+                    self.send_response(message, result)
                 elif command in ('continue', 'next', 'stepIn', 'stepOut'):
                     if self.debugger:
                         thread_id = int(self.debugger.current_thread)
@@ -206,11 +324,10 @@ class DebugAdapterHandler(threading.Thread):
             self.send_error_response(message, extra)
 
     def send_message(self, message: Dict[str, Any]):
-        print("[Client] Sending message:", message, flush=True)
-        content = json.dumps(message)
-        header = f"Content-Length: {len(content)}\r\n\r\n"
-        self.client.send(header.encode('utf-8'))
-        self.client.send(content.encode('utf-8'))
+        if self.server.verbose:
+            print("[Client] Sending message:", message, flush=True)
+        content = json.dumps(message).encode('utf-8')
+        self.writer.write(b"Content-Length: %d\r\n\r\n%s" % (len(content), content))
 
     def send_response(self, request: Dict[str, Any], body: Dict[str, Any]):
         self.send_message({
@@ -241,8 +358,10 @@ class DebugAdapterHandler(threading.Thread):
 
     def close(self):
         self.running = False
+        if self.writer.is_closing():
+            return
         try:
-            self.client.close()
+            self.writer.close()
         except Exception:  # pragma: no cover
             pass
         print("[Client] Client handler closed", flush=True)
@@ -250,82 +369,291 @@ class DebugAdapterHandler(threading.Thread):
 
 class IdAdapter:
     # id is the id of the object in the current process
-    # oid is the id of the object in the original dumped process
     # rid is the reference id of the object to DAP clients
-    Container = namedtuple('Container', ['id', 'oid', 'rid', 'value'])
-
+    # A rid is only assigned when the object is first sent to the client,
+    # so the size of the adapter grows with what the user explores
     def __init__(self) -> None:
-        self._id_index: Dict[int, IdAdapter.Container] = {}
-        self._oid_index: Dict[int, IdAdapter.Container] = {}
-        self._rid_index: Dict[int, IdAdapter.Container] = {}
+        self._id_to_rid: Dict[int, int] = {}
+        # The objects are kept here so their ids are never reused
+        self._rid_to_object: Dict[int, Any] = {}
         self._rid = 1
 
-    def add(self, obj, oid):
-        _id = id(obj)
-        if _id not in self._id_index:
-            container = self.Container(id=_id, oid=oid, rid=self._rid, value=obj)
-            self._id_index[_id] = container
-            self._oid_index[oid] = container
-            self._rid_index[self._rid] = container
-            self._rid += 1
+    def __len__(self) -> int:
+        return len(self._rid_to_object)
 
-    def object_to_rid(self, obj):
+    def object_to_rid(self, obj) -> int:
         _id = id(obj)
-        if _id in self._id_index:
-            return self._id_index[_id].rid
-        return 0  # pragma: no cover
+        rid = self._id_to_rid.get(_id)
+        if rid is None:
+            rid = self._id_to_rid[_id] = self._rid
+            self._rid_to_object[rid] = obj
+            self._rid += 1
+        return rid
 
     def rid_to_object(self, rid):
-        if rid in self._rid_index:
-            return self._rid_index[rid].value
-        return None
+        return self._rid_to_object.get(rid)
+
+
+class RequestCancelled(BaseException):
+    """
+    Raised in the code run for a request that is cancelled. It's not an
+    Exception, so the evaluated code does not catch it with except Exception
+    """
+
+
+class EvaluationTimeout(BaseException):
+    """
+    Raised in the evaluated code that runs out of time, not an Exception for
+    the same reason as RequestCancelled
+    """
+
+
+def run_with_deadline(func: Callable, timeout: Optional[float], cancelled: Optional[threading.Event]):
+    """
+    Run func() in the current thread, and raise EvaluationTimeout or
+    RequestCancelled in it when it runs out of time or it's cancelled.
+
+    It's done with a trace function, so only Python code is interrupted,
+    a long call into C code is only stopped after it returns.
+
+    Python removes the trace function once it raises, so if the code catches
+    the exception and carries on, a profile function, which is called on
+    every call and return, puts the trace function back and it's raised again.
+    """
+    if timeout is None and cancelled is None:
+        return func()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    top_frame = sys._getframe()
+
+    def rearm(frame, event, arg):
+        if sys.gettrace() is None:
+            sys.settrace(trace)
+            # The frames that are already running need the trace function
+            # for the line events
+            while frame is not None and frame is not top_frame:
+                frame.f_trace = trace
+                frame = frame.f_back
+
+    def trace(frame, event, arg):
+        # Raising on the exception event would only replace the exception
+        # that is being handled, the next line event raises out of the handler
+        if event != 'exception':
+            if cancelled is not None and cancelled.is_set():
+                sys.setprofile(rearm)
+                raise RequestCancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                sys.setprofile(rearm)
+                raise EvaluationTimeout(f"evaluation took more than {timeout} seconds")
+        return trace
+
+    previous_trace = sys.gettrace()
+    previous_profile = sys.getprofile()
+    sys.settrace(trace)
+    try:
+        return func()
+    finally:
+        # The profile function first, or it could put the trace function back
+        sys.setprofile(previous_profile)
+        sys.settrace(previous_trace)
+
+
+def load_dump(path: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    data = load_data_from_path(path, progress=progress)
+    data["files"] = {filename: ''.join(lines) for filename, lines in data["files"].items()}
+    return data
+
+
+class DumpCache:
+    """
+    An LRU cache of the loaded dumps, shared by all the sessions of a server.
+    The key is the path with the mtime and the size of the file, so a
+    rewritten dump is loaded again.
+
+    The expressions evaluated in a session could change the objects, so a
+    session discards its dump from the cache before the first evaluate, and
+    the later sessions load a fresh copy.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: OrderedDict[tuple, tuple[Dict[str, Any], int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[tuple, threading.Lock] = {}
+
+    def get(self, path: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            # Only one session loads a dump, the others wait for it
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            try:
+                data = load_dump(path, progress=progress)
+                size = self._estimate_size(data)
+
+                with self._lock:
+                    if size <= self.max_size:
+                        # The older versions of the same file will never be used
+                        for old_key in [k for k in self._entries if k[0] == path]:
+                            self.size -= self._entries.pop(old_key)[1]
+                        self._entries[key] = (data, size)
+                        self.size += size
+                        while self.size > self.max_size:
+                            _, (_, evicted_size) = self._entries.popitem(last=False)
+                            self.size -= evicted_size
+            finally:
+                with self._lock:
+                    # A failed or cancelled load should not block the later ones
+                    if self._loading.get(key) is loading:
+                        del self._loading[key]
+            return data
+
+    def discard(self, data: Dict[str, Any]):
+        """
+        Remove the loaded dump from the cache, if it's still there
+        """
+        with self._lock:
+            for key, (entry_data, size) in self._entries.items():
+                if entry_data is data:
+                    del self._entries[key]
+                    self.size -= size
+                    break
+
+    def _estimate_size(self, data: Dict[str, Any]) -> int:
+        container = data["container"]
+        size = sum(len(source) for source in data["files"].values())
+        for proxy in container._proxies.values():
+            size += sys.getsizeof(proxy)
+            if isinstance(proxy, PyObjectProxy):
+                size += sys.getsizeof(proxy._coredumpy_values)
+        return size
+
+
+class PreviewRepr(reprlib.Repr):
+    """
+    A repr with bounded size and time for the values shown to the client.
+    Unlike reprlib.Repr, sets and dicts are not sorted, so the cost only
+    depends on the limits, not the size of the container.
+    """
+    def __init__(self):
+        super().__init__()
+        self.maxlevel = 3
+        self.maxtuple = self.maxlist = self.maxset = self.maxfrozenset = self.maxdeque = 20
+        self.maxdict = 10
+        self.maxstring = 200
+        self.maxlong = 100
+        self.maxother = 200
+        # reprlib.Repr only has fillvalue since 3.11
+        self.fillvalue = '...'
+
+    def repr1(self, x, level):
+        if isinstance(x, str) and level == self.maxlevel:
+            # A string variable is shown as is, like str()
+            return x if len(x) <= self.maxstring else x[:self.maxstring] + self.fillvalue
+        if not hasattr(self, f"repr_{type(x).__name__}"):
+            # Subclasses of the builtin containers, like OrderedDict or
+            # namedtuple, would be repr() as a whole by repr_instance
+            if isinstance(x, tuple) and hasattr(type(x), "_fields"):
+                return self._repr_namedtuple(x, level)
+            for base in (dict, list, tuple, set, frozenset, deque):
+                if isinstance(x, base):
+                    return f"{type(x).__name__}({getattr(self, f'repr_{base.__name__}')(x, level)})"
+        return super().repr1(x, level)
+
+    def _repr_namedtuple(self, x, level):
+        if level <= 0:
+            return f"{type(x).__name__}({self.fillvalue})"
+        fields = getattr(type(x), "_fields")
+        pieces = [f"{field}={self.repr1(value, level - 1)}"
+                  for field, value in itertools.islice(zip(fields, x), self.maxtuple)]
+        if len(x) > self.maxtuple:
+            pieces.append(self.fillvalue)
+        return f"{type(x).__name__}({', '.join(pieces)})"
+
+    def repr_set(self, x, level):
+        if not x:
+            return 'set()'
+        return self._repr_iterable(x, level, '{', '}', self.maxset)
+
+    def repr_frozenset(self, x, level):
+        if not x:
+            return 'frozenset()'
+        return self._repr_iterable(x, level, 'frozenset({', '})', self.maxfrozenset)
+
+    def repr_dict(self, x, level):
+        if not x:
+            return '{}'
+        if level <= 0:
+            return '{' + self.fillvalue + '}'
+        pieces = [f"{self.repr1(key, level - 1)}: {self.repr1(value, level - 1)}"
+                  for key, value in itertools.islice(x.items(), self.maxdict)]
+        if len(x) > self.maxdict:
+            pieces.append(self.fillvalue)
+        return '{' + ', '.join(pieces) + '}'
+
+
+class VariableRange:
+    """
+    A range of the children of a large container, shown as a group to the client
+    """
+    __slots__ = ('obj', 'start', 'end')
+
+    def __init__(self, obj, start: int, end: int):
+        self.obj = obj
+        self.start = start
+        self.end = end
 
 
 class CoredumpyDebugger:
-    def __init__(self, path: str):
+    def __init__(self, path: str, cache: Optional[DumpCache] = None):
         self.path = path
+        self.cache = cache
         self.container: Optional[PyObjectContainer] = None
         self.files: Dict[str, str] = {}
         self.threads: Dict[str, Dict[str, Any]] = {}
         self.current_thread: str = ''
+        # The dump shared through the cache, until the session could change it
+        self.cached_data: Optional[Dict[str, Any]] = None
+        # ids of the marker frames of the collapsed recursions
+        self.collapsed_frames: Set[str] = set()
         self.sid_to_file: Dict[int, str] = {}
         self.file_to_sid: Dict[str, int] = {}
-        self.frame_stacks: Dict[str, List[Dict]] = {}
+        # thread -> the frames of the thread, from the top, built on demand
+        self.frame_stacks: Dict[str, List[FrameType]] = {}
         self.id_adapter = IdAdapter()
-
-    def start(self) -> None:
-        data = load_data_from_path(self.path)
+        self.ranges: Dict[tuple, VariableRange] = {}
+        # id -> preview of the objects with a reference, which are kept alive
+        self.previews: Dict[int, str] = {}
+        self.preview_repr = PreviewRepr()
+
+    def start(self, progress: Optional[Callable[[int, int], None]] = None) -> None:
+        if self.cache is not None:
+            data = self.cache.get(self.path, progress=progress)
+            self.cached_data = data
+        else:
+            data = load_dump(self.path, progress=progress)
         self.container = data["container"]
         self.files = data["files"]
         self.threads = data["threads"]
         self.current_thread = data["current_thread"]
+        self.collapsed_frames = data["collapsed_frames"]
         assert isinstance(self.container, PyObjectContainer)
-        for oid, proxy in self.container._proxies.items():
-            self.id_adapter.add(proxy, oid)
         for sid, filename in enumerate(self.files, 1):
             self.file_to_sid[filename] = sid
             self.sid_to_file[sid] = filename
-            self.files[filename] = ''.join(self.files[filename])
 
         self.frame_stacks = {}
-        for thread in self.threads:
-            self.frame_stacks[thread] = []
-            frame: FrameType = self.threads[thread]["frame"]
-            while frame:
-                source_reference = self.file_to_sid.get(frame.f_code.co_filename, 0)
-                source = {
-                    'path': os.path.basename(frame.f_code.co_filename),
-                    'sourceReference': source_reference,
-                    'presentationHint': 'normal' if source_reference != 0 else 'deemphasize'
-                }
-                self.frame_stacks[thread].append({
-                    'id': self.id_adapter.object_to_rid(frame),
-                    'name': frame.f_code.co_name,
-                    'line': frame.f_lineno,
-                    'column': 0,
-                    'source': source
-                })
-                frame = frame.f_back  # type: ignore
 
     def get_threads(self) -> List[Dict[str, Any]]:
         return [
@@ -336,8 +664,50 @@ class CoredumpyDebugger:
             for thread in self.threads
         ]
 
-    def get_stack_trace(self, thread_id: int) -> List[Dict[str, Any]]:
-        return self.frame_stacks.get(str(thread_id), [])
+    def get_frames(self, thread: str) -> List[FrameType]:
+        if thread not in self.frame_stacks:
+            frames: List[FrameType] = []
+            if thread in self.threads:
+                frame: FrameType = self.threads[thread]["frame"]
+                # f_back is unknown if the dump was stopped early by the timeout
+                while isinstance(frame, PyObjectProxy):
+                    frames.append(frame)
+                    frame = frame.f_back  # type: ignore
+            self.frame_stacks[thread] = frames
+        return self.frame_stacks[thread]
+
+    def get_frame_entry(self, frame: FrameType) -> Dict[str, Any]:
+        # The code and the line are unknown if the dump was stopped early by
+        # the timeout
+        filename = getattr(frame.f_code, 'co_filename', '<unknown>')
+        source_reference = self.file_to_sid.get(filename, 0)
+        source = {
+            'path': os.path.basename(filename),
+            'sourceReference': source_reference,
+            'presentationHint': 'normal' if source_reference != 0 else 'deemphasize'
+        }
+        entry = {
+            'id': self.id_adapter.object_to_rid(frame),
+            'name': getattr(frame.f_code, 'co_name', '<unknown>'),
+            'line': frame.f_lineno if isinstance(frame.f_lineno, int) else 0,
+            'column': 0,
+            'source': source
+        }
+        if getattr(frame, '_coredumpy_id', None) in self.collapsed_frames:
+            entry['presentationHint'] = 'label'
+        return entry
+
+    def get_stack_trace(self, thread_id: int, start_frame: int = 0, levels: int = 0) -> tuple[List[Dict[str, Any]], int]:
+        """
+        Get the entries of the frames in [start_frame, start_frame + levels)
+        of a thread, all the frames from start_frame if levels is 0
+
+        @return:
+            The frame entries and the total number of frames
+        """
+        frames = self.get_frames(str(thread_id))
+        end = len(frames) if not levels else start_frame + levels
+        return [self.get_frame_entry(frame) for frame in frames[start_frame:end]], len(frames)
 
     def get_source(self, source_reference: int) -> str:
         if source_reference not in self.sid_to_file:
@@ -349,97 +719,205 @@ class CoredumpyDebugger:
         frame = self.id_adapter.rid_to_object(frame_id)
         if frame is None:
             return []
-        return [
-            {
-                'name': 'Local',
-                'presentationHint': 'locals',
-                'variablesReference': self.id_adapter.object_to_rid(frame.f_locals),
-                'expensive': False
-            },
-            {
-                'name': 'Global',
-                'presentationHint': 'globals',
-                'variablesReference': self.id_adapter.object_to_rid(frame.f_globals),
+        scopes = []
+        for name, hint, variables in (('Local', 'locals', frame.f_locals), ('Global', 'globals', frame.f_globals)):
+            scope = {
+                'name': name,
+                'presentationHint': hint,
+                'variablesReference': self.id_adapter.object_to_rid(variables),
                 'expensive': False
             }
-        ]
+            # The variables are unknown if the dump stopped early, like by the timeout
+            if isinstance(variables, dict):
+                scope['namedVariables'] = len(variables)
+            scopes.append(scope)
+        return scopes
 
     def get_variable(self, name, variable) -> Dict[str, Any]:
-        if isinstance(variable, PyObjectProxy) or is_container(type(variable)):
+        if isinstance(variable, PyObjectProxy) or is_container(type(variable)) or self._is_tensor(variable):
             variables_reference = self.id_adapter.object_to_rid(variable)
         else:
             variables_reference = 0
 
-        return {
+        ret = {
             'name': str(name),
-            'value': str(variable),
+            'value': self.get_preview(variable, cache=bool(variables_reference)),
             'type': str(type(variable)),
             'variablesReference': variables_reference
         }
 
-    def get_variables(self, variables_reference: int) -> List[Dict[str, Any]]:
-        if self.container is None:  # pragma: no cover
-            return []
-        obj = self.id_adapter.rid_to_object(variables_reference)
-
-        variables = []
-        it: Iterable
-        if isinstance(obj, dict):
-            it = obj.items()
+        if variables_reference:
+            kind, length = self._get_children_info(variable)
+            if kind is not None:
+                ret[f'{kind}Variables'] = length
+
+        return ret
+
+    def get_preview(self, obj, cache: bool = False) -> str:
+        if not cache:
+            return self.preview_repr.repr(obj)
+        preview = self.previews.get(id(obj))
+        if preview is None:
+            preview = self.previews[id(obj)] = self.preview_repr.repr(obj)
+        return preview
+
+    def _is_tensor(self, obj) -> bool:
+        torch = sys.modules.get("torch")
+        return torch is not None and isinstance(obj, torch.Tensor)
+
+    def _get_children_info(self, obj) -> tuple[Optional[str], int]:
+        """
+        Get the kind of the children, 'indexed' or 'named', and the number of them
+        """
+        if isinstance(obj, (dict, ChainMap)):
+            return 'named', len(obj)
         elif isinstance(obj, PyObjectProxy):
-            it = {attr: getattr(obj, attr) for attr in dir(obj)}.items()
-        elif isinstance(obj, (set, frozenset, list, tuple)):
-            it = enumerate(obj)
-        elif isinstance(obj, getattr(sys.modules.get("torch"), "Tensor", type(None))):
-            import torch
-            assert isinstance(obj, torch.Tensor)
+            return 'named', len(dir(obj))
+        elif isinstance(obj, tuple) and hasattr(type(obj), "_fields"):
+            return 'named', len(obj)
+        elif isinstance(obj, (set, frozenset, list, tuple, deque)):
+            return 'indexed', len(obj)
+        elif self._is_tensor(obj):
+            if obj.dim() == 0:
+                return None, 0
+            return 'indexed', obj.shape[0]
+        return None, 0
+
+    def _get_children(self, obj, start: int, end: int) -> Iterable:
+        """
+        Get the (name, value) of the children in [start, end), without
+        iterating the whole container if possible
+        """
+        if isinstance(obj, (dict, ChainMap)):
+            return itertools.islice(obj.items(), start, end)
+        elif isinstance(obj, PyObjectProxy):
+            return ((attr, getattr(obj, attr)) for attr in dir(obj)[start:end])
+        elif isinstance(obj, tuple) and hasattr(type(obj), "_fields"):
+            return zip(getattr(type(obj), "_fields")[start:end], obj[start:end])
+        elif isinstance(obj, (list, tuple)):
+            return zip(range(start, end), obj[start:end])
+        elif isinstance(obj, (set, frozenset, deque)):
+            return zip(range(start, end), itertools.islice(obj, start, end))
+        elif self._is_tensor(obj):
+            # Only index the requested rows so the full tensor is never materialized
             if obj.dim() == 1:
-                it = {i: t.item() for i, t in enumerate(obj)}.items()
-            else:
-                data = {}
-                for i, t in enumerate(obj):
-                    self.id_adapter.add(t, id(t))
-                    data[i] = t
-                it = data.items()
-        else:  # pragma: no cover
-            print("unexpected type", type(obj))
+                return zip(range(start, end), obj[start:end].tolist())
+            return ((i, obj[i]) for i in range(start, end))
+        return ()  # pragma: no cover
+
+    def _get_range(self, obj, start: int, end: int) -> "VariableRange":
+        key = (id(obj), start, end)
+        if key not in self.ranges:
+            self.ranges[key] = VariableRange(obj, start, end)
+        return self.ranges[key]
+
+    def get_variables(self,
+                      variables_reference: int,
+                      start: int = 0,
+                      count: int = 0,
+                      filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        if self.container is None:  # pragma: no cover
             return []
+        obj = self.id_adapter.rid_to_object(variables_reference)
 
-        for key, value in it:
-            variables.append(self.get_variable(key, value))
+        if isinstance(obj, VariableRange):
+            offset, length = obj.start, obj.end - obj.start
+            obj = obj.obj
+            kind, _ = self._get_children_info(obj)
+        else:
+            offset = 0
+            kind, length = self._get_children_info(obj)
 
-        return variables
+        if kind is None or (filter is not None and filter != kind):
+            return []
 
-    def get_evaluate(self, frame_id: int, expression: str) -> str:
+        if not count and length > CHUNK_SIZE:
+            # The client did not ask for a page, show the children as ranges
+            # like [0:300], [300:600], ... and nest them for huge containers
+            chunk = CHUNK_SIZE
+            while length > chunk * CHUNK_SIZE:
+                chunk *= CHUNK_SIZE
+            variables = []
+            for chunk_start in range(offset, offset + length, chunk):
+                chunk_end = min(chunk_start + chunk, offset + length)
+                variables.append({
+                    'name': f'[{chunk_start}:{chunk_end}]',
+                    'value': '',
+                    'variablesReference': self.id_adapter.object_to_rid(self._get_range(obj, chunk_start, chunk_end)),
+                    f'{kind}Variables': chunk_end - chunk_start,
+                })
+            return variables
+
+        begin = offset + start
+        end = offset + length if not count else min(offset + length, begin + count)
+
+        return [self.get_variable(key, value) for key, value in self._get_children(obj, begin, end)]
+
+    def get_evaluate(self,
+                     frame_id: int,
+                     expression: str,
+                     timeout: Optional[float] = None,
+                     cancelled: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Evaluate or execute the expression in the frame, and stop it if it
+        takes more than timeout seconds or cancelled is set.
+
+        @return:
+            The body of the evaluate response, a structured result has a
+            variablesReference to expand it
+        """
         frame = self.id_adapter.rid_to_object(frame_id)
         if not frame:
-            return ""
+            return {'result': '', 'variablesReference': 0}
 
         f_locals = frame.f_locals
         f_globals = frame.f_globals
 
-        try:
-            return str(eval(expression, f_globals, f_locals))
-        except SyntaxError:
+        # The expression could change any object
+        self.previews.clear()
+        if self.cache is not None and self.cached_data is not None:
+            # The other sessions should not see the changes
+            self.cache.discard(self.cached_data)
+            self.cached_data = None
+
+        def evaluate():
             try:
+                return eval(expression, f_globals, f_locals), True
+            except SyntaxError:
                 exec(expression, f_globals, f_locals)
-            except Exception as e:
-                return "".join(traceback.format_exception_only(e))
+                return None, False
+
+        try:
+            value, has_value = run_with_deadline(evaluate, timeout, cancelled)
+        except EvaluationTimeout as e:
+            return {'result': f"TimeoutError: {e}", 'variablesReference': 0}
         except Exception as e:
-            return "".join(traceback.format_exception_only(e))
+            return {'result': "".join(traceback.format_exception_only(e)), 'variablesReference': 0}
+
+        if not has_value:
+            return {'result': '', 'variablesReference': 0}
 
-        return ""
+        variable = self.get_variable('', value)
+        variable['result'] = variable.pop('value')
+        del variable['name']
+        return variable
 
     def stop(self):
         pass
 
 
-def run_server():
-    server = DebugAdapterServer()
+def run_server(host: str = 'localhost',
+               port: int = 6742,
+               unix_socket: Optional[str] = None,
+               verbose: bool = False,
+               cache_size: int = 512 * 1024 * 1024,
+               eval_timeout: Optional[float] = 10.0):
+    server = DebugAdapterServer(host, port, unix_socket=unix_socket, verbose=verbose,
+                                cache_size=cache_size, eval_timeout=eval_timeout)
 
     def signal_handler(sig, frame):
         print("\nReceived Ctrl+C, shutting down...")
-        server.running = False
+        server.shutdown()
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
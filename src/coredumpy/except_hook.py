@@ -6,8 +6,6 @@ import sys
 import traceback
 from typing import Callable, Optional, Union, Iterable, Type
 
-from .coredumpy import dump
-
 
 _original_excepthook = sys.excepthook
 
@@ -47,10 +45,12 @@ def patch_except(path: Optional[Union[str, Callable[[], str]]] = None,
         while tb.tb_next:
             tb = tb.tb_next
 
+        from .coredumpy import dump
         filename = dump(tb.tb_frame, description=_get_description(type, value, tb),
-                        path=path, directory=directory)
+                        path=path, directory=directory, exception=value)
         _original_excepthook(type, value, tb)
-        print(f'Your frame stack is dumped, open it with\n'
-              f'coredumpy load {filename}')
+        if filename is not None:
+            print(f'Your frame stack is dumped, open it with\n'
+                  f'coredumpy load {filename}')
 
     sys.excepthook = _excepthook
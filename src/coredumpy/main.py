@@ -6,7 +6,9 @@ import argparse
 import os
 import runpy
 
-from .coredumpy import load, peek, run, host
+from .catalog import get_catalog_path, query_catalog, update_catalog
+from .coredumpy import load, peek, print_summary, run, host, stats
+from .summary_index import get_directory_headers
 
 
 def main():
@@ -26,9 +28,41 @@ def main():
 
     subparsers_peek = subparsers.add_parser("peek", help="Peek a dump file.")
     subparsers_peek.add_argument("files", help="The dump file to load.", nargs="+")
+    subparsers_peek.add_argument("--jobs", "-j", type=int, default=None,
+                                 help="The number of processes to read the dumps in a directory.")
+
+    subparsers_stats = subparsers.add_parser("stats", help="Show the types that take the most time or space in a dump.")
+    subparsers_stats.add_argument("file", type=str, help="The dump file, created with config.profile_dump.")
+    subparsers_stats.add_argument("--top", type=int, default=20, help="The number of types to show.")
+    subparsers_stats.add_argument("--sort", choices=["time", "bytes", "count"], default="time",
+                                  help="Sort the types by the encode time, the size or the number of objects.")
+
+    subparsers_index = subparsers.add_parser("index", help="Build or update the catalog of a dump directory.")
+    subparsers_index.add_argument("directory", type=str, help="The dump directory.")
+    subparsers_index.add_argument("--catalog", help="The path of the catalog file", default=None)
+    subparsers_index.add_argument("--jobs", "-j", type=int, default=None,
+                                  help="The number of processes to read the dumps.")
+
+    subparsers_ls = subparsers.add_parser("ls", help="List the dumps in the catalog of a dump directory.")
+    subparsers_ls.add_argument("directory", type=str, nargs="?", default=".", help="The dump directory.")
+    subparsers_ls.add_argument("--catalog", help="The path of the catalog file", default=None)
+    subparsers_ls.add_argument("--host", help="The host that created the dump", default=None)
+    subparsers_ls.add_argument("--exception", help="The exception type, like KeyError", default=None)
+    subparsers_ls.add_argument("--function", help="The function of the top frame", default=None)
+    subparsers_ls.add_argument("--file", help="A part of the file name of the top frame", default=None)
+    subparsers_ls.add_argument("--since", help="The earliest dump time, like 2024-01-01", default=None)
+    subparsers_ls.add_argument("--until", help="The latest dump time, like 2024-01-31", default=None)
+    subparsers_ls.add_argument("--limit", type=int, help="The maximum number of results", default=None)
 
     subparsers_host = subparsers.add_parser("host", help="Host a DAP server.")
     subparsers_host.add_argument("--conf", help="The startup configuration file to run", default=None)
+    subparsers_host.add_argument("--port", type=int, help="The TCP port to listen on", default=6742)
+    subparsers_host.add_argument("--unix", help="Listen on a Unix domain socket instead of TCP", default=None)
+    subparsers_host.add_argument("--verbose", action="store_true", help="Print all the DAP messages", default=False)
+    subparsers_host.add_argument("--cache-size", type=int, default=512,
+                                 help="The memory budget in MB to keep loaded dumps for repeated launches, 0 to disable")
+    subparsers_host.add_argument("--eval-timeout", type=float, default=10.0,
+                                 help="The time limit in seconds of an evaluate request, 0 to disable")
 
     options, args = parser.parse_known_args()
 
@@ -45,10 +79,9 @@ def main():
         for file in options.files:
             if os.path.exists(file):
                 if os.path.isdir(file):
-                    for f in os.listdir(file):
+                    for path, header in get_directory_headers(file, jobs=options.jobs):
                         try:
-                            path = os.path.join(file, f)
-                            peek(path)
+                            print_summary(path, header)
                         except Exception:
                             pass
                 else:
@@ -58,7 +91,32 @@ def main():
                         pass
             else:
                 print(f"File {file} not found.")
+    elif options.command == "stats":
+        if os.path.exists(options.file):
+            stats(options.file, top=options.top, sort=options.sort)
+        else:
+            print(f"File {options.file} not found.")
+    elif options.command == "index":
+        if os.path.isdir(options.directory):
+            read, removed = update_catalog(options.directory, options.catalog, jobs=options.jobs)
+            print(f"{read} files indexed, {removed} removed in {get_catalog_path(options.directory, options.catalog)}")
+        else:
+            print(f"Directory {options.directory} not found.")
+    elif options.command == "ls":
+        try:
+            dumps = query_catalog(options.directory, options.catalog,
+                                  host=options.host, exception=options.exception,
+                                  function=options.function, filename=options.file,
+                                  since=options.since, until=options.until, limit=options.limit)
+        except FileNotFoundError:
+            print(f"Catalog not found, create it with\ncoredumpy index {options.directory}")
+        else:
+            for dump in dumps:
+                location = f"{dump['function']} ({dump['filename']}:{dump['lineno']})" if dump["function"] else ""
+                print(f"{dump['dump_time']}  {dump['node']}  {dump['exception'] or '-'}  {location}")
+                print(f"    {dump['path']}")
     elif options.command == "run":
         run(options, args)
     elif options.command == "host":
-        host()
+        host(port=options.port, unix_socket=options.unix, verbose=options.verbose,
+             cache_size=options.cache_size * 1024 * 1024, eval_timeout=options.eval_timeout or None)
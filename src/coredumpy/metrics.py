@@ -0,0 +1,73 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import contextlib
+import sys
+import time
+from typing import Optional
+
+from .config import config
+
+
+# The phases of a dump, in order
+PHASES = ("frame_walk", "source_capture", "traversal", "encode", "compress", "write")
+
+
+class DumpMetrics:
+    """
+    The metrics of a dump, passed to each callback in config.dump_callbacks
+    after coredumpy.dump or coredumpy.dumps
+    """
+    def __init__(self, exception: Optional[BaseException] = None):
+        # The path of the dump file, None for dumps or a skipped dump
+        self.path: Optional[str] = None
+        # Why no dump is created, "duplicate" or "rate_limit"
+        self.skipped: Optional[str] = None
+        # phase -> seconds, for the phases in PHASES that are run
+        self.phases: dict[str, float] = {}
+        self.object_count = 0
+        # The size of the dump file, or the length of the string for dumps
+        self.bytes_written = 0
+        # Whether the traversal is stopped by config.dump_timeout
+        self.timed_out = False
+        # The number of strings hidden by config.hide_secret or config.hide_environ
+        self.redaction_count = 0
+        self.exception = type(exception).__qualname__ if exception is not None else None
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.phases.values())
+
+    @contextlib.contextmanager
+    def measure(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "skipped": self.skipped,
+            "phases": dict(self.phases),
+            "total_time": self.total_time,
+            "object_count": self.object_count,
+            "bytes_written": self.bytes_written,
+            "timed_out": self.timed_out,
+            "redaction_count": self.redaction_count,
+            "exception": self.exception,
+        }
+
+    def __repr__(self):
+        return f"DumpMetrics({self.as_dict()})"
+
+
+def report_metrics(metrics: DumpMetrics):
+    for callback in config.dump_callbacks:
+        try:
+            callback(metrics)
+        except Exception as e:
+            # A broken monitoring should never break the dump, which is
+            # usually made while handling a crash
+            print(f"coredumpy: dump callback {callback!r} failed: {e!r}", file=sys.stderr)
@@ -0,0 +1,163 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import json
+import os
+import threading
+import time
+from types import FrameType
+from typing import Optional
+
+
+# All the bookkeeping files in a dump directory start with this prefix
+INTERNAL_FILE_PREFIX = ".coredumpy_"
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def get_crash_signature(exception: BaseException, frame: Optional[FrameType]) -> str:
+    """
+    Get the signature of a crash from the exception type and the (code, lineno)
+    of each frame in the stack. It's cheap because no object is traversed.
+    """
+    import hashlib
+    exc_type = type(exception)
+    h = hashlib.sha1(f"{exc_type.__module__}.{exc_type.__qualname__}\n".encode())
+    while frame is not None:
+        code = frame.f_code
+        h.update(f"{code.co_filename}:{code.co_name}:{code.co_firstlineno}:{frame.f_lineno}\n".encode())
+        frame = frame.f_back
+    return h.hexdigest()[:16]
+
+
+def _get_counter_path(directory: str, signature: str) -> str:
+    return os.path.join(directory, f"{INTERNAL_FILE_PREFIX}{signature}.count")
+
+
+def _write_counter(path: str, record: dict):
+    try:
+        with open(path, "w") as f:
+            json.dump(record, f)
+    except OSError:  # pragma: no cover
+        pass
+
+
+def record_duplicate(directory: str, signature: str, window: float) -> Optional[str]:
+    """
+    If a dump with the same signature was created in the directory within
+    window seconds, bump its counter and return the path of that dump.
+    Otherwise return None and a new dump should be created.
+    """
+    path = _get_counter_path(directory, signature)
+    try:
+        with open(path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - record["time"] > window or not os.path.exists(record["dump"]):
+        return None
+    record["count"] += 1
+    record["last_time"] = time.time()
+    _write_counter(path, record)
+    return record["dump"]
+
+
+def record_dump(directory: str, signature: str, dump_path: str):
+    now = time.time()
+    _write_counter(_get_counter_path(directory, signature),
+                   {"dump": dump_path, "time": now, "last_time": now, "count": 1})
+
+
+class _RateLimiter:
+    """
+    A token bucket of dumps. It holds at most limit tokens and refills one
+    token every period / limit seconds.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._last_time = None
+        self.suppressed = 0
+
+    def acquire(self, limit: int, period: int) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._last_time is None:
+                self._tokens = float(limit)
+            else:
+                self._tokens = min(float(limit), self._tokens + (now - self._last_time) * limit / period)
+            self._last_time = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.suppressed += 1
+            return False
+
+    def pop_suppressed(self) -> int:
+        with self._lock:
+            suppressed, self.suppressed = self.suppressed, 0
+            return suppressed
+
+    def reset(self):
+        with self._lock:
+            self._tokens = 0.0
+            self._last_time = None
+            self.suppressed = 0
+
+
+rate_limiter = _RateLimiter()
+
+
+def _is_dump(path: str, header: dict) -> bool:
+    """
+    Whether the file is a dump created by coredumpy, so it can be removed.
+    Besides the header, it has to be gzipped or have the default filename of
+    coredumpy.dump, so a random json file in the directory is never removed.
+    """
+    metadata = header.get("metadata")
+    if not isinstance(metadata, dict) or "version" not in metadata or "dump_time" not in metadata:
+        return False
+    if os.path.basename(path).startswith("coredumpy_"):
+        return True
+    try:
+        with open(path, "rb") as f:
+            return f.read(2) == GZIP_MAGIC
+    except OSError:  # pragma: no cover
+        return False
+
+
+def enforce_quota(directory: str, quota: int, keep: str) -> list[str]:
+    """
+    Remove the oldest dumps in the directory until the total size of the
+    dumps is within quota bytes. keep, the newest dump, is never removed.
+
+    @return:
+        The paths of the removed dumps
+    """
+    # summary_index depends on coredumpy, which depends on this module
+    from .summary_index import get_directory_headers
+
+    dumps = []
+    for path, header in get_directory_headers(directory, jobs=1):
+        if not _is_dump(path, header):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:  # pragma: no cover
+            continue
+        dumps.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in dumps)
+    removed = []
+    for _, size, path in sorted(dumps):
+        if total <= quota:
+            break
+        if os.path.samefile(path, keep):
+            continue
+        try:
+            os.remove(path)
+        except OSError:  # pragma: no cover
+            continue
+        total -= size
+        removed.append(path)
+    return removed
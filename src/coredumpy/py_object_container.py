@@ -1,12 +1,19 @@
 # Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
-import queue
+import json
 import time
+from typing import Callable, Optional
 
 from .config import config
 from .type_support import TypeSupportManager, NotReady
 from .py_object_proxy import PyObjectProxy, _unknown
+# Register the type supports before anything is dumped or loaded
+from .types import builtin_types, stdlib_types, torch_types  # noqa: F401
+
+
+# How often load_objects reports its progress, in objects
+PROGRESS_INTERVAL = 10000
 
 
 class PyObjectContainer:
@@ -14,13 +21,50 @@ class PyObjectContainer:
         self._objects = {}
         self._objects_holder = {}
         self._proxies = {}
+        # name of the type support -> [count, encode time, serialized bytes]
+        self._stats = {}
+        # Whether add_objects stopped because of config.dump_timeout
+        self.timed_out = False
+        # The number of strings hidden by add_objects
+        self.redaction_count = 0
 
     def clear(self):
         self._objects.clear()
         self._objects_holder.clear()
         self._proxies.clear()
+        self._stats.clear()
+        self.timed_out = False
+        self.redaction_count = 0
+
+    def _record_stats(self, obj, data: dict, duration: float):
+        support = TypeSupportManager.get_encoder(type(obj))
+        if support is not None:
+            name = support.__name__
+        else:
+            # The objects without a type support are broken down by class
+            name = f"default_dump[{data['type']}]"
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = [0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] += len(json.dumps(data))
+
+    def get_stats(self) -> dict[str, dict]:
+        """
+        Get the statistics of the dumped objects for each type support,
+        only collected when config.profile_dump is set
+        """
+        return {
+            name: {"count": count, "time": duration, "bytes": size}
+            for name, (count, duration, size) in self._stats.items()
+        }
 
-    def add_objects(self, objs, depth=None):
+    def add_objects(self, objs, depth=None, exclude=()):
+        """
+        Dump the objects and the objects they refer to, up to depth levels.
+        The objects whose ids are in exclude are not dumped.
+        """
         TypeSupportManager.load_lazy_supports()
         with config.dump_context():
             objects = {}
@@ -28,69 +72,124 @@ class PyObjectContainer:
             pending_objects = list(objs)
             if depth is None:
                 depth = config.default_recursion_depth
+            profile = config.profile_dump
+            redaction_count = config.redaction_count
             start_time = time.perf_counter()
             while curr_recursion_depth < depth and pending_objects:
                 next_objects = {}
                 for o in pending_objects:
-                    data, new_objects = TypeSupportManager.dump(o)
+                    if profile:
+                        encode_start = time.perf_counter()
+                        data, new_objects = TypeSupportManager.dump(o)
+                        self._record_stats(o, data, time.perf_counter() - encode_start)
+                    else:
+                        data, new_objects = TypeSupportManager.dump(o)
                     objects[str(id(o))] = data
                     # To avoid repeated object ids, we keep a reference to all
                     # objects in the container
                     self._objects_holder[str(id(o))] = o
                     if new_objects:
                         for new_obj in new_objects:
-                            if str(id(new_obj)) not in objects:
+                            if str(id(new_obj)) not in objects and str(id(new_obj)) not in exclude:
                                 next_objects[str(id(new_obj))] = new_obj
                 curr_recursion_depth += 1
                 pending_objects = list(next_objects.values())
                 if time.perf_counter() - start_time > config.dump_timeout:
+                    if curr_recursion_depth < depth and pending_objects:
+                        self.timed_out = True
                     break
             self._objects.update(objects)
+            self.redaction_count += config.redaction_count - redaction_count
         return [self._objects[str(id(obj))] for obj in objs]
 
     def add_object(self, obj, depth=None):
         return self.add_objects([obj], depth)[0]
 
-    def load_objects(self, objects):
+    def load_objects(self, objects, progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Rebuild the objects from their dumped data.
+
+        Objects are resolved in dependency order. An object that is not ready
+        waits for its missing dependencies and is retried exactly once when
+        the last one becomes available. Mutable containers are published as
+        placeholders before their items are filled, which is how cycles are
+        resolved.
+
+        progress, if given, is called with the number of the visited objects
+        and the total number every PROGRESS_INTERVAL objects. An exception
+        raised by it aborts the load.
+        """
         TypeSupportManager.load_lazy_supports()
         self._objects = objects.copy()
-        unresolved_queue = queue.Queue()
-        not_ready_objects = set()
-        for key in self._objects:
-            unresolved_queue.put(key)
-
-        while not unresolved_queue.empty():
-            obj_id = unresolved_queue.get()
-            data = self._objects.get(obj_id)
-            if data is None:
-                proxy = _unknown
-            else:
-                if obj_id in self._proxies:
-                    if obj_id in not_ready_objects:
-                        dependency = TypeSupportManager.reload(self._proxies[obj_id], data, self._proxies)
-                        if dependency:
-                            for dep_id in dependency:
-                                unresolved_queue.put(dep_id)
-                            unresolved_queue.put(obj_id)
-                        else:
-                            not_ready_objects.remove(obj_id)
-                    continue
-                else:
-                    proxy, dependency = TypeSupportManager.load(data, self._proxies)
-                    if isinstance(proxy, PyObjectProxy):
-                        proxy.link_container(self)
-                        proxy._coredumpy_id = obj_id
-                    if dependency:
-                        not_ready_objects.add(obj_id)
-                        for dep_id in dependency:
-                            unresolved_queue.put(dep_id)
-                        unresolved_queue.put(obj_id)
-                    else:
-                        if obj_id in not_ready_objects:
-                            not_ready_objects.remove(obj_id)
+        proxies = self._proxies
+        # obj_id -> ids of the objects waiting for obj_id
+        waiters: dict[str, list[str]] = {}
+        # obj_id -> number of dependencies obj_id is still waiting for
+        missing_count: dict[str, int] = {}
+        # placeholders that need to be reloaded once their dependencies are ready
+        placeholders = set()
+        visited = set()
+        ready = []
+        stack = list(self._objects)
+
+        def publish(obj_id, proxy):
+            proxies[obj_id] = proxy
+            for waiter in waiters.pop(obj_id, ()):
+                missing_count[waiter] -= 1
+                if missing_count[waiter] == 0:
+                    del missing_count[waiter]
+                    ready.append(waiter)
 
+        def wait(obj_id, dependency):
+            missing = {dep_id for dep_id in dependency if dep_id not in proxies}
+            for dep_id in missing:
+                waiters.setdefault(dep_id, []).append(obj_id)
+                if dep_id not in visited:
+                    stack.append(dep_id)
+            if missing:
+                missing_count[obj_id] = len(missing)
+            return bool(missing)
+
+        def load(obj_id):
+            data = self._objects[obj_id]
+            proxy, dependency = TypeSupportManager.load(data, proxies)
+            if isinstance(proxy, PyObjectProxy):
+                proxy.link_container(self)
+                proxy._coredumpy_id = obj_id
             if proxy is not NotReady:
-                self._proxies[obj_id] = proxy
+                if dependency:
+                    placeholders.add(obj_id)
+                publish(obj_id, proxy)
+            if dependency and not wait(obj_id, dependency):
+                if proxy is not NotReady:
+                    # The placeholder itself was the missing dependency
+                    ready.append(obj_id)
+
+        def reload(obj_id):
+            dependency = TypeSupportManager.reload(proxies[obj_id], self._objects[obj_id], proxies)
+            if not dependency or not wait(obj_id, dependency):
+                placeholders.discard(obj_id)
+
+        while stack or ready:
+            if ready:
+                obj_id = ready.pop()
+                if obj_id in placeholders:
+                    reload(obj_id)
+                elif obj_id not in proxies:
+                    load(obj_id)
+                continue
+
+            obj_id = stack.pop()
+            if obj_id in visited:
+                continue
+            visited.add(obj_id)
+            if progress is not None and len(visited) % PROGRESS_INTERVAL == 0:
+                progress(len(visited), len(self._objects))
+            if obj_id not in self._objects:
+                publish(obj_id, _unknown)
+            else:
+                load(obj_id)
+
         # We could have imported some new libs while loading the objects,
         # so we need to load lazy supports again to make sure we have all the
         # encoders listed
@@ -11,32 +11,78 @@ _unknown = _Unknown()
 
 
 class PyObjectProxy:
+    # __dict__ is only created when an attribute is resolved or assigned
+    __slots__ = (
+        "_coredumpy_type",
+        "_coredumpy_id",
+        "_coredumpy_container",
+        "_coredumpy_shape",
+        "_coredumpy_values",
+        "__dict__",
+    )
+
+    # Attribute names -> {name: index}, shared by all the proxies with the
+    # same attribute names. Each proxy only keeps a tuple of object ids.
+    _shapes: dict[tuple, dict[str, int]] = {(): {}}
+
     def __init__(self):
         self._coredumpy_type = None
-        self._coredumpy_attrs = {}
+        self._coredumpy_id = None
         self._coredumpy_container = None
+        self._coredumpy_shape = self._shapes[()]
+        self._coredumpy_values = ()
+
+    @classmethod
+    def _get_shape(cls, keys: tuple) -> dict[str, int]:
+        shape = cls._shapes.get(keys)
+        if shape is None:
+            shape = cls._shapes[keys] = {key: i for i, key in enumerate(keys)}
+        return shape
+
+    @property
+    def _coredumpy_attrs(self):
+        return dict(zip(self._coredumpy_shape, self._coredumpy_values))
 
     def link_container(self, container):
         self._coredumpy_container = container
 
     def set_coredumpy_attr(self, key, value):
-        self._coredumpy_attrs[key] = value
+        shape = self._coredumpy_shape
+        values = self._coredumpy_values
+        if key in shape:
+            index = shape[key]
+            self._coredumpy_values = values[:index] + (value,) + values[index + 1:]
+        else:
+            self._coredumpy_shape = self._get_shape(tuple(shape) + (key,))
+            self._coredumpy_values = values + (value,)
+        self.__dict__.pop(key, None)
+
+    def set_coredumpy_attrs(self, attrs: dict):
+        self._coredumpy_shape = self._get_shape(tuple(attrs))
+        self._coredumpy_values = tuple(attrs.values())
 
     def __getattr__(self, item):
-        try:
-            return super().__getattribute__(item)
-        except AttributeError:
-            if self._coredumpy_container is None:
-                raise RuntimeError("Container is not linked")
-            if item in self._coredumpy_attrs:
-                return self._coredumpy_container._proxies.get(self._coredumpy_attrs[item], _unknown)
-            raise AttributeError(f"'{self._coredumpy_type}' object has no attribute '{item}'")
+        # Only called when the normal lookup fails, so resolved attributes
+        # never get here
+        container = self._coredumpy_container
+        if container is None:
+            raise RuntimeError("Container is not linked")
+        index = self._coredumpy_shape.get(item)
+        if index is not None:
+            obj_id = self._coredumpy_values[index]
+            if obj_id not in container._proxies:
+                return _unknown
+            value = container._proxies[obj_id]
+            self.__dict__[item] = value
+            return value
+        raise AttributeError(f"'{self._coredumpy_type}' object has no attribute '{item}'")
 
     def __repr__(self):
         return f"<{self._coredumpy_type} object at 0x{int(self._coredumpy_id):x}>"
 
     def __dir__(self):
+        shape = self._coredumpy_shape
         return (
-            list(self._coredumpy_attrs.keys())
-            + [attr for attr in vars(self) if not attr.startswith("_coredumpy")]
+            list(shape)
+            + [attr for attr in vars(self) if attr not in shape and not attr.startswith("_coredumpy")]
         )
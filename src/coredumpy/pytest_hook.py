@@ -55,8 +55,10 @@ def pytest_exception_interact(node, call, report):
                 tb = tb.tb_next
             filename = coredumpy.dump(tb.tb_frame,
                                       description=_get_description(report),
-                                      directory=directory)
-            print(f'Your frame stack is dumped, open it with\n'
-                  f'coredumpy load {filename}')
+                                      directory=directory,
+                                      exception=call.excinfo.value)
+            if filename is not None:
+                print(f'Your frame stack is dumped, open it with\n'
+                      f'coredumpy load {filename}')
         except Exception:  # pragma: no cover
             print("Failed to dump the frame stack.")
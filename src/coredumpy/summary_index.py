@@ -0,0 +1,118 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import concurrent.futures
+import json
+import os
+import tempfile
+from typing import Optional
+
+from .coredumpy import load_header_from_path
+from .policy import INTERNAL_FILE_PREFIX
+
+
+INDEX_FILENAME = f"{INTERNAL_FILE_PREFIX}index.json"
+INDEX_VERSION = 2
+
+# Starting a process pool is only worth it for a lot of new dumps
+PARALLEL_THRESHOLD = 16
+
+
+def _load_header(path: str) -> Optional[dict]:
+    try:
+        header = load_header_from_path(path)
+        if not isinstance(header, dict) or "metadata" not in header:
+            # Valid json, but not a dump file
+            return None
+        # Legacy dumps have everything in the header, only keep the summary
+        return {key: value for key, value in header.items()
+                if key not in ("objects", "threads", "current_thread", "files")}
+    except Exception:
+        # Not a dump file
+        return None
+
+
+def load_headers(paths: list[str], jobs: Optional[int] = None) -> list[Optional[dict]]:
+    """
+    Load the headers of the dumps, None for the files that are not dumps.
+    The files are read in a process pool if there are many of them.
+    """
+    if len(paths) > PARALLEL_THRESHOLD and jobs != 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(paths) // ((jobs or os.cpu_count() or 1) * 4))
+            return list(executor.map(_load_header, paths, chunksize=chunksize))
+    return [_load_header(path) for path in paths]
+
+
+def _read_index(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, INDEX_FILENAME)) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index["files"]
+    except Exception:
+        pass
+    return {}
+
+
+def _write_index(directory: str, files: dict):
+    # Write to a temporary file first so concurrent peeks never see a
+    # partial index
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=INDEX_FILENAME, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": INDEX_VERSION, "files": files}, f)
+        os.replace(tmp_path, os.path.join(directory, INDEX_FILENAME))
+    except OSError:
+        # The directory could be read-only, the index is only a cache
+        pass
+
+
+def get_directory_headers(directory: str, jobs: Optional[int] = None) -> list[tuple[str, dict]]:
+    """
+    Get the headers of all the dumps in a directory
+
+    The headers are cached in an index file in the directory, keyed by the
+    mtime and the size of each file, so only new or changed files are read.
+
+    @param directory:
+        The directory of the dumps
+    @param jobs:
+        The number of processes to read the new files, os.cpu_count() if not specified
+    @return:
+        A list of (path, header) in the order of os.listdir
+    """
+    cached = _read_index(directory)
+    files = {}
+    new_files = []
+    for filename in os.listdir(directory):
+        if filename.startswith(INTERNAL_FILE_PREFIX):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:  # pragma: no cover
+            continue
+        if not os.path.isfile(path):
+            continue
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = cached.get(filename)
+        if entry is not None and entry["key"] == key:
+            files[filename] = entry
+        else:
+            files[filename] = {"key": key, "header": None}
+            new_files.append(filename)
+
+    headers = load_headers([os.path.join(directory, filename) for filename in new_files], jobs=jobs)
+
+    for filename, header in zip(new_files, headers):
+        files[filename]["header"] = header
+
+    if new_files or len(files) != len(cached):
+        _write_index(directory, files)
+
+    return [
+        (os.path.join(directory, filename), entry["header"])
+        for filename, entry in files.items()
+        if entry["header"] is not None
+    ]
@@ -4,6 +4,7 @@
 
 import abc
 import inspect
+import sys
 import types
 import warnings
 from typing import Callable, Optional, Union
@@ -25,7 +26,7 @@ class TypeSupportBase(metaclass=TypeSupportMeta):
 
     @classmethod
     @abc.abstractmethod
-    def get_type(cls) -> tuple[Union[type, Callable], str]:  # pragma: no cover
+    def get_type(cls) -> tuple[Union[type, Callable, None], str]:  # pragma: no cover
         ...
 
     @classmethod
@@ -51,6 +52,7 @@ class TypeSupportManager:
     _encoders: dict = {}
     _decoders: dict = {}
     _lazy_supports: list = []
+    _matched_supports: list = []
 
     @classmethod
     def add_support(cls, support: TypeSupportBase):
@@ -58,7 +60,11 @@ class TypeSupportManager:
             encode_type, decode_annotation = support.get_type()
         except NotImplementedError:
             return
-        if isinstance(encode_type, type):
+        if encode_type is None:
+            # The support can't be registered by a single type, it provides a
+            # match(obj_type) method to be checked in get_encoder
+            cls._matched_supports.append(support)
+        elif isinstance(encode_type, type):
             cls._encoders[encode_type] = support
         else:
             cls._lazy_supports.append(support)
@@ -75,11 +81,21 @@ class TypeSupportManager:
                 lazy_supports.append(support)
         cls._lazy_supports = lazy_supports
 
+    @classmethod
+    def get_encoder(cls, obj_type: type):
+        if obj_type in cls._encoders:
+            return cls._encoders[obj_type]
+        for support in cls._matched_supports:
+            if support.match(obj_type):
+                return support
+        return None
+
     @classmethod
     def dump(cls, obj: object):
-        if type(obj) in cls._encoders:
+        support = cls.get_encoder(type(obj))
+        if support is not None:
             try:
-                return cls._encoders[type(obj)].dump(obj)
+                return support.dump(obj)
             except NotImplementedError:
                 pass
         return cls.default_dump(obj)
@@ -135,14 +151,15 @@ class TypeSupportManager:
     @classmethod
     def default_load(cls, data, objects):
         obj = PyObjectProxy()
-        obj._coredumpy_type = data["type"]
-        for attr, val in data.get("attrs", {}).items():
-            obj.set_coredumpy_attr(attr, val)
+        # There are usually a lot of objects with the same type
+        obj._coredumpy_type = sys.intern(data["type"])
+        if "attrs" in data:
+            obj.set_coredumpy_attrs(data["attrs"])
         return obj, None
 
 
 def is_container(t):
-    support = TypeSupportManager._encoders.get(t)
+    support = TypeSupportManager.get_encoder(t)
     if isinstance(support, type):
         return issubclass(support, TypeSupportContainerBase)
     return False
@@ -61,10 +61,12 @@ class StrSupport(BasicTypeSupportBase):
     def dump(cls, obj):
         if config.hide_environ and obj in config.environ_values:
             obj = "***redacted***"
+            config.record_redaction()
         elif config.hide_secret:
             for pattern in config.secret_patterns:
                 if pattern.match(obj):
                     obj = "***redacted***"
+                    config.record_redaction()
                     break
         return super().dump(obj)
 
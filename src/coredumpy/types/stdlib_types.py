@@ -1,9 +1,11 @@
 # Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
+import importlib
+import itertools
 import sys
 
-from ..type_support import TypeSupportBase
+from ..type_support import TypeSupportBase, TypeSupportContainerBase, NotReady
 
 
 class DecimalTypeSupport(TypeSupportBase):
@@ -24,3 +26,377 @@ class DecimalTypeSupport(TypeSupportBase):
     def load(cls, data, objects):
         import decimal
         return decimal.Decimal(data["value"]), None
+
+
+class CollectionsTypeSupportBase(TypeSupportContainerBase):
+    _name: str
+
+    @classmethod
+    def get_type(cls):
+        def lazy():
+            if sys.modules.get("collections"):
+                import collections
+                return getattr(collections, cls._name)
+            return None
+        return lazy, f"collections.{cls._name}"
+
+
+class CollectionsDictSupportBase(CollectionsTypeSupportBase):
+    @classmethod
+    def dump(cls, obj):
+        new_objects = []
+        value = {}
+        for key, val in obj.items():
+            value[str(id(key))] = str(id(val))
+            new_objects.append(key)
+            new_objects.append(val)
+        return {"type": f"collections.{cls._name}", "value": value}, new_objects
+
+    @classmethod
+    def load(cls, data, objects):
+        import collections
+        obj = getattr(collections, cls._name)()
+        return obj, cls.reload(obj, data, objects)
+
+    @classmethod
+    def reload(cls, container, data, objects):
+        # Only fill the container when every item is ready, so the
+        # insertion order is kept
+        dependency = [obj_id for obj_id in itertools.chain(data["value"].keys(), data["value"].values())
+                      if obj_id not in objects]
+        if dependency:
+            return dependency
+        container.clear()
+        for key_id, value_id in data["value"].items():
+            container[objects[key_id]] = objects[value_id]
+        return []
+
+
+class OrderedDictSupport(CollectionsDictSupportBase):
+    _name = "OrderedDict"
+
+
+class CounterSupport(CollectionsDictSupportBase):
+    _name = "Counter"
+
+
+class DefaultDictSupport(CollectionsDictSupportBase):
+    _name = "defaultdict"
+
+    @classmethod
+    def dump(cls, obj):
+        data, new_objects = super().dump(obj)
+        if obj.default_factory is None:
+            data["default_factory"] = None
+        else:
+            data["default_factory"] = str(id(obj.default_factory))
+            new_objects.append(obj.default_factory)
+        return data, new_objects
+
+    @classmethod
+    def reload(cls, container, data, objects):
+        factory_id = data.get("default_factory")
+        if factory_id is not None:
+            if factory_id not in objects:
+                return [factory_id] + super().reload(container, data, objects)
+            factory = objects[factory_id]
+            # The factory may not be restorable, it's fine to lose it
+            container.default_factory = factory if callable(factory) else None
+        return super().reload(container, data, objects)
+
+
+class DequeSupport(CollectionsTypeSupportBase):
+    _name = "deque"
+
+    @classmethod
+    def dump(cls, obj):
+        value = [str(id(item)) for item in obj]
+        return {"type": "collections.deque", "value": value, "maxlen": obj.maxlen}, list(obj)
+
+    @classmethod
+    def load(cls, data, objects):
+        import collections
+        obj = collections.deque(maxlen=data["maxlen"])  # type: ignore
+        dependency = []
+        for item_id in data["value"]:
+            if item_id not in objects:
+                obj.append(NotReady)
+                dependency.append(item_id)
+            else:
+                obj.append(objects[item_id])
+        return obj, dependency
+
+    @classmethod
+    def reload(cls, container, data, objects):
+        dependency = []
+        for i, item_id in enumerate(data["value"]):
+            if item_id not in objects:
+                dependency.append(item_id)
+            else:
+                container[i] = objects[item_id]
+        return dependency
+
+
+class ChainMapSupport(CollectionsTypeSupportBase):
+    _name = "ChainMap"
+
+    @classmethod
+    def dump(cls, obj):
+        value = [str(id(m)) for m in obj.maps]
+        return {"type": "collections.ChainMap", "value": value}, list(obj.maps)
+
+    @classmethod
+    def load(cls, data, objects):
+        import collections
+        obj = collections.ChainMap()  # type: ignore
+        return obj, cls.reload(obj, data, objects)
+
+    @classmethod
+    def reload(cls, container, data, objects):
+        dependency = [map_id for map_id in data["value"] if map_id not in objects]
+        if not dependency:
+            container.maps = [objects[map_id] for map_id in data["value"]]
+        return dependency
+
+
+class NamedTupleSupport(TypeSupportContainerBase):
+    _types: dict = {}
+
+    @classmethod
+    def get_type(cls):
+        # namedtuple classes are created dynamically, so they are matched
+        # by their _fields attribute instead
+        return None, "collections.namedtuple"
+
+    @classmethod
+    def match(cls, obj_type):
+        return issubclass(obj_type, tuple) and hasattr(obj_type, "_fields")
+
+    @classmethod
+    def dump(cls, obj):
+        obj_type = type(obj)
+        value = [str(id(item)) for item in obj]
+        return {
+            "type": "collections.namedtuple",
+            "name": obj_type.__name__,
+            "module": obj_type.__module__,
+            "fields": list(obj_type._fields),
+            "value": value
+        }, list(obj)
+
+    @classmethod
+    def load(cls, data, objects):
+        dependency = [item_id for item_id in data["value"] if item_id not in objects]
+        if dependency:
+            return NotReady, dependency
+        namedtuple_type = cls._get_namedtuple_type(data["module"], data["name"], tuple(data["fields"]))
+        return namedtuple_type(*(objects[item_id] for item_id in data["value"])), None
+
+    @classmethod
+    def _get_namedtuple_type(cls, module, name, fields):
+        key = (module, name, fields)
+        if key not in cls._types:
+            import collections
+            try:
+                cls._types[key] = collections.namedtuple(name, fields, rename=True, module=module)
+            except ValueError:
+                raise NotImplementedError(name)
+        return cls._types[key]
+
+
+class StdlibValueSupportBase(TypeSupportBase):
+    _module: str
+    _name: str
+
+    @classmethod
+    def get_type(cls):
+        def lazy():
+            if module := sys.modules.get(cls._module):
+                return getattr(module, cls._name)
+            return None
+        return lazy, f"{cls._module}.{cls._name}"
+
+    @classmethod
+    def dump(cls, obj):
+        return {"type": f"{cls._module}.{cls._name}", "value": cls.encode(obj)}, None
+
+    @classmethod
+    def load(cls, data, objects):
+        module = importlib.import_module(cls._module)
+        return cls.decode(getattr(module, cls._name), data["value"]), None
+
+    @classmethod
+    def encode(cls, obj):
+        return str(obj)
+
+    @classmethod
+    def decode(cls, t, value):
+        return t(value)
+
+
+class DatetimeSupport(StdlibValueSupportBase):
+    _module = "datetime"
+    _name = "datetime"
+
+    @classmethod
+    def encode(cls, obj):
+        return obj.isoformat()
+
+    @classmethod
+    def decode(cls, t, value):
+        return t.fromisoformat(value)
+
+
+class DateSupport(DatetimeSupport):
+    _name = "date"
+
+
+class TimeSupport(DatetimeSupport):
+    _name = "time"
+
+
+class TimedeltaSupport(StdlibValueSupportBase):
+    _module = "datetime"
+    _name = "timedelta"
+
+    @classmethod
+    def encode(cls, obj):
+        return [obj.days, obj.seconds, obj.microseconds]
+
+    @classmethod
+    def decode(cls, t, value):
+        days, seconds, microseconds = value
+        return t(days=days, seconds=seconds, microseconds=microseconds)
+
+
+class UUIDSupport(StdlibValueSupportBase):
+    _module = "uuid"
+    _name = "UUID"
+
+
+class FractionSupport(StdlibValueSupportBase):
+    _module = "fractions"
+    _name = "Fraction"
+
+
+class PatternSupport(StdlibValueSupportBase):
+    _module = "re"
+    _name = "Pattern"
+
+    @classmethod
+    def encode(cls, obj):
+        if isinstance(obj.pattern, bytes):
+            return {"pattern": obj.pattern.hex(), "bytes": True, "flags": obj.flags}
+        return {"pattern": obj.pattern, "bytes": False, "flags": obj.flags}
+
+    @classmethod
+    def decode(cls, t, value):
+        import re
+        pattern = bytes.fromhex(value["pattern"]) if value["bytes"] else value["pattern"]
+        return re.compile(pattern, value["flags"])
+
+
+class PurePosixPathSupport(StdlibValueSupportBase):
+    _module = "pathlib"
+    _name = "PurePosixPath"
+
+
+class PureWindowsPathSupport(StdlibValueSupportBase):
+    _module = "pathlib"
+    _name = "PureWindowsPath"
+
+
+class PosixPathSupport(StdlibValueSupportBase):
+    _module = "pathlib"
+    _name = "PosixPath"
+
+    @classmethod
+    def decode(cls, t, value):
+        try:
+            return t(value)
+        except NotImplementedError:
+            # Concrete paths of another OS can't be instantiated
+            import pathlib
+            return getattr(pathlib, f"Pure{cls._name}")(value)
+
+
+class WindowsPathSupport(PosixPathSupport):
+    _name = "WindowsPath"
+
+
+class IPv4AddressSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv4Address"
+
+
+class IPv6AddressSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv6Address"
+
+
+class IPv4NetworkSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv4Network"
+
+
+class IPv6NetworkSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv6Network"
+
+
+class IPv4InterfaceSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv4Interface"
+
+
+class IPv6InterfaceSupport(StdlibValueSupportBase):
+    _module = "ipaddress"
+    _name = "IPv6Interface"
+
+
+class EnumSupport(TypeSupportBase):
+    _types: dict = {}
+
+    @classmethod
+    def get_type(cls):
+        # Every enum is a different class, so they are matched by subclass
+        return None, "enum.Enum"
+
+    @classmethod
+    def match(cls, obj_type):
+        enum = sys.modules.get("enum")
+        return enum is not None and issubclass(obj_type, enum.Enum)
+
+    @classmethod
+    def dump(cls, obj):
+        obj_type = type(obj)
+        return {
+            "type": "enum.Enum",
+            "module": obj_type.__module__,
+            "qualname": obj_type.__qualname__,
+            "name": obj.name,
+            "value": str(id(obj.value))
+        }, [obj.value]
+
+    @classmethod
+    def load(cls, data, objects):
+        if data["value"] not in objects:
+            return NotReady, [data["value"]]
+        value = objects[data["value"]]
+        try:
+            enum_type = importlib.import_module(data["module"])
+            for name in data["qualname"].split("."):
+                enum_type = getattr(enum_type, name)
+            return enum_type(value), None
+        except Exception:
+            pass
+        # The enum class is not available, make up one with the same member
+        key = (data["module"], data["qualname"], data["name"])
+        if key not in cls._types:
+            import enum
+            try:
+                cls._types[key] = enum.Enum(data["qualname"].rsplit(".", 1)[-1],
+                                            [(data["name"] or "_", value)], module=data["module"])
+            except Exception:
+                raise NotImplementedError(data["qualname"])
+        return cls._types[key](value), None
@@ -5,7 +5,64 @@ import base64
 import io
 import sys
 
-from ..type_support import TypeSupportContainerBase
+from ..config import config
+from ..type_support import TypeSupportBase, TypeSupportContainerBase, NotReady
+
+
+class TorchTensorSummary:
+    """
+    The placeholder of a tensor that is too large to be dumped. Only the
+    shape, dtype and some basic statistics are kept.
+    """
+    def __init__(self, data):
+        self.shape = tuple(data["size"])
+        self.dtype = data["dtype"]
+        self.device = data["device"]
+        self.numel = data["numel"]
+        self.min = data.get("min")
+        self.max = data.get("max")
+        self.mean = data.get("mean")
+        self.std = data.get("std")
+
+    def __repr__(self):
+        stats = ", ".join(f"{name}={getattr(self, name)}" for name in ("min", "max", "mean", "std")
+                          if getattr(self, name) is not None)
+        return (f"<tensor summary shape={self.shape} dtype={self.dtype} device={self.device}"
+                f"{', ' + stats if stats else ''}>")
+
+
+def _get_bytes(data_ptr: int, nbytes: int) -> bytes:
+    # Copy the raw memory directly, iterating the storage is extremely slow
+    import ctypes
+    return ctypes.string_at(data_ptr, nbytes) if nbytes else b""
+
+
+class TorchUntypedStorageSupport(TypeSupportBase):
+    @classmethod
+    def get_type(cls):
+        def lazy():
+            if sys.modules.get("torch"):
+                import torch
+                return torch.UntypedStorage
+            return None
+        return lazy, "torch.UntypedStorage"
+
+    @classmethod
+    def dump(cls, obj):
+        if obj.device.type == "meta":
+            raise NotImplementedError()
+        if obj.device.type != "cpu":
+            obj = obj.cpu()
+        value = _get_bytes(obj.data_ptr(), obj.nbytes())
+        return {"type": "torch.UntypedStorage", "value": base64.b64encode(value).decode()}, None
+
+    @classmethod
+    def load(cls, data, objects):
+        import torch
+        value = base64.b64decode(data["value"])
+        if not value:
+            return torch.UntypedStorage(0), None
+        return torch.UntypedStorage.from_buffer(value, dtype=torch.uint8), None
 
 
 class TorchTensorSupport(TypeSupportContainerBase):
@@ -21,16 +78,102 @@ class TorchTensorSupport(TypeSupportContainerBase):
     @classmethod
     def dump(cls, obj):
         import torch
-        buffer = io.BytesIO()
-        torch.save(obj, buffer)
-        return {"type": "torch.Tensor", "value": base64.b64encode(buffer.getvalue()).decode()}, None
+        if obj.layout != torch.strided:
+            # Sparse and other special layouts do not have a plain storage
+            buffer = io.BytesIO()
+            torch.save(obj, buffer)
+            return {"type": "torch.Tensor", "value": base64.b64encode(buffer.getvalue()).decode()}, None
+
+        if obj.device.type == "meta":
+            raise NotImplementedError()
+
+        data = {
+            "type": "torch.Tensor",
+            "dtype": str(obj.dtype).removeprefix("torch."),
+            "device": str(obj.device),
+            "size": list(obj.size()),
+        }
+
+        data["requires_grad"] = obj.requires_grad
+        # Conjugate and negative views share the storage with a lazy bit,
+        # which is not in the raw data
+        if obj.is_conj():
+            data["conj"] = True
+        if obj.is_neg():
+            data["neg"] = True
+
+        nbytes = obj.numel() * obj.element_size()
+        storage = obj.untyped_storage()
+        threshold = config.tensor_summary_threshold
+        if threshold and storage.nbytes() > threshold:
+            if nbytes > threshold:
+                data["summary"] = cls._get_summary(obj)
+            else:
+                # A small view of a large storage, only the view is copied
+                view = obj.detach().cpu().contiguous()
+                data["inline"] = base64.b64encode(_get_bytes(view.data_ptr(), nbytes)).decode()
+            return data, None
+
+        # Views of the same storage share the storage object, so the storage
+        # is only dumped once by the container
+        data["storage"] = str(id(storage))
+        data["offset"] = obj.storage_offset()
+        data["stride"] = list(obj.stride())
+        return data, [storage]
 
     @classmethod
     def load(cls, data, objects):
         import torch
-        buffer = io.BytesIO(base64.b64decode(data["value"]))
-        return torch.load(buffer, weights_only=True), None
+        if "value" in data:
+            # Legacy format, the tensor was saved with torch.save
+            buffer = io.BytesIO(base64.b64decode(data["value"]))
+            return torch.load(buffer, weights_only=True), None
+
+        if "summary" in data:
+            return TorchTensorSummary(dict(data, **data["summary"])), None
+
+        dtype = getattr(torch, data["dtype"])
+        if "inline" in data:
+            value = base64.b64decode(data["inline"])
+            storage = torch.UntypedStorage.from_buffer(value, dtype=torch.uint8) if value else torch.UntypedStorage(0)
+            tensor = torch.empty(0, dtype=dtype).set_(storage, 0, data["size"])
+        else:
+            if data["storage"] not in objects:
+                return NotReady, [data["storage"]]
+
+            storage = objects[data["storage"]]
+            if not isinstance(storage, torch.UntypedStorage):
+                # The storage was not dumped, likely because of the depth
+                # limit or the timeout, only the shape is known
+                numel = 1
+                for dim in data["size"]:
+                    numel *= dim
+                return TorchTensorSummary(dict(data, numel=numel)), None
+
+            tensor = torch.empty(0, dtype=dtype).set_(storage, data["offset"], data["size"], data["stride"])
+        if data.get("conj"):
+            tensor = tensor.conj()
+        if data.get("neg"):
+            tensor = torch._neg_view(tensor)
+        if data.get("requires_grad"):
+            tensor.requires_grad_(True)
+        return tensor, None
 
     @classmethod
     def reload(cls, container, data, objects):
         assert False, "torch.Tensor should never be reloaded"  # pragma: no cover
+
+    @classmethod
+    def _get_summary(cls, obj):
+        summary = {"numel": obj.numel()}
+        if obj.numel() == 0 or obj.is_complex():
+            return summary
+        try:
+            t = obj.detach().double()
+            summary["min"] = t.min().item()
+            summary["max"] = t.max().item()
+            summary["mean"] = t.mean().item()
+            summary["std"] = t.std().item() if obj.numel() > 1 else 0.0
+        except Exception:  # pragma: no cover
+            pass
+        return summary
@@ -5,8 +5,6 @@
 import unittest
 from typing import Callable, Optional, Union
 
-from .coredumpy import dump
-
 
 def patch_unittest(path: Optional[Union[str, Callable[[], str]]] = None,
                    directory: Optional[str] = None):
@@ -30,27 +28,31 @@ def patch_unittest(path: Optional[Union[str, Callable[[], str]]] = None,
     _original_addFailure = unittest.TestResult.addFailure
 
     def addError(self, test, err):
+        from .coredumpy import dump
         tb = err[2]
         while tb.tb_next:
             tb = tb.tb_next
         try:
             filename = dump(tb.tb_frame, description=_get_description(self, test, err),
-                            path=path, directory=directory)
-            print(f'Your frame stack is dumped, open it with\n'
-                  f'coredumpy load {filename}')
+                            path=path, directory=directory, exception=err[1])
+            if filename is not None:
+                print(f'Your frame stack is dumped, open it with\n'
+                      f'coredumpy load {filename}')
         except Exception:  # pragma: no cover
             print("Failed to dump the frame stack.")
         _original_addError(self, test, err)
 
     def addFailure(self, test, err):
+        from .coredumpy import dump
         tb = err[2]
         while tb.tb_next:
             tb = tb.tb_next
         try:
             filename = dump(tb.tb_frame, description=_get_description(self, test, err),
-                            path=path, directory=directory)
-            print(f'Your frame stack is dumped, open it with\n'
-                  f'coredumpy load {filename}')
+                            path=path, directory=directory, exception=err[1])
+            if filename is not None:
+                print(f'Your frame stack is dumped, open it with\n'
+                      f'coredumpy load {filename}')
         except Exception:  # pragma: no cover
             print("Failed to dump the frame stack.")
         _original_addFailure(self, test, err)
@@ -80,6 +80,14 @@ class TestBase(unittest.TestCase):
         stderr = stderr.decode(errors='backslashreplace')
         return stdout, stderr
 
+    def run_cli(self, args):
+        process = subprocess.Popen(normalize_commands(["coredumpy"] + args),
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        stdout = stdout.decode(errors='backslashreplace')
+        stderr = stderr.decode(errors='backslashreplace')
+        return stdout, stderr
+
     def convert_object(self, obj, before_load=None):
         container = PyObjectContainer()
         container.add_object(obj)
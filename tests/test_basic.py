@@ -299,6 +299,87 @@ class TestBasic(TestBase):
             stdout, _ = self.run_peek([os.path.join(tmpdir, "nosuchfile")])
             self.assertIn("not found", stdout)
 
+    def test_peek_header_only(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dump.json")
+            script = f"""
+                import coredumpy
+                coredumpy.dump(description="header only", path={repr(path)})
+            """
+            self.run_script(script)
+            # Break everything after the header, peek should not need it
+            with open(path) as f:
+                header = f.readline()
+            with open(path, "w") as f:
+                f.write(header + "{broken")
+
+            stdout, _ = self.run_peek([path])
+            self.assertIn("header only", stdout)
+            self.assertIn("Python v", stdout)
+
+    def test_legacy_format(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dump.json")
+            # Dump files used to be a single json document, like the output of dumps()
+            script = f"""
+                import json
+                import coredumpy
+                def f():
+                    x = 142857
+                    data = json.loads(coredumpy.dumps(description="legacy"))
+                    assert data["description"] == "legacy" and "objects" in data
+                    with open({repr(path)}, "w") as f:
+                        f.write(json.dumps(data))
+                f()
+            """
+            self.run_script(script)
+            stdout, _ = self.run_peek([path])
+            self.assertIn("legacy", stdout)
+
+            stdout, _ = self.run_test("", path, ["p x", "q"])
+            self.assertIn("142857", stdout)
+
+    def test_asyncio_tasks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dump.json")
+            script = f"""
+                import asyncio
+                import coredumpy
+                from coredumpy.coredumpy import load_data_from_path
+
+                async def inner(value):
+                    await asyncio.sleep(100)
+
+                async def outer(value):
+                    await inner(value + 1)
+
+                async def main():
+                    coredumpy.config.dump_asyncio_tasks = True
+                    tasks = [asyncio.create_task(outer(i), name=f"worker{{i}}") for i in range(3)]
+                    await asyncio.sleep(0)
+                    coredumpy.dump(path={repr(path)})
+                    for task in tasks:
+                        task.cancel()
+
+                asyncio.run(main())
+
+                data = load_data_from_path({repr(path)})
+                for thread in data["threads"].values():
+                    frame = thread["frame"]
+                    names = []
+                    while frame:
+                        names.append(frame.f_code.co_name)
+                        frame = frame.f_back
+                    print(thread["name"], names)
+                    if thread["name"].startswith("Task"):
+                        print("value", thread["frame"].f_back.f_locals["value"])
+            """
+            stdout, _ = self.run_script(script)
+            for i in range(3):
+                self.assertIn(f"Task worker{i} ['sleep', 'inner', 'outer']", stdout)
+                self.assertIn(f"value {i + 1}", stdout)
+            self.assertIn("'main'", stdout)
+
     def test_script_with_options(self):
         # Test script with options
         script = textwrap.dedent("""
@@ -321,3 +402,125 @@ class TestBasic(TestBase):
     def test_nonexist_file(self):
         stdout, stderr = self.run_test("", "nonexist_dump", [])
         self.assertIn("File nonexist_dump not found", stdout)
+
+    def test_collapse_recursion(self):
+        script = """
+            import coredumpy
+            coredumpy.config.collapse_recursion = 2
+            def f(n):
+                return g(n)
+            def g(n):
+                if n == 100:
+                    coredumpy.dump(path="coredumpy_dump")
+                    return
+                return f(n + 1)
+            f(0)
+        """
+        stdout, _ = self.run_test(script, "coredumpy_dump", [
+            "w",
+            "u 5",
+            "p n",
+            "u",
+            "p n",
+            "q"
+        ])
+        self.assertIn("script.py(11)<module>", stdout)
+        # f(0) -> g(0) -> ... -> f(100) -> g(100), the repetitions of (f, g) at
+        # line 5 and 10 are collapsed except for 2 on each side
+        self.assertIn("<192 repeated frames collapsed>()", stdout)
+        where = stdout.split("(Pdb)")[1]
+        self.assertEqual(where.count("-> return g(n)"), 6)
+        self.assertIn("NameError", stdout)
+        self.assertIn("(Pdb) 2\n", stdout)
+
+    def test_profile_dump(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = f"""
+                import coredumpy
+                class Point:
+                    def __init__(self, x):
+                        self.x = x
+                def f():
+                    points = [Point(i) for i in range(100)]
+                    coredumpy.dump(path={repr(path)})
+                coredumpy.config.profile_dump = True
+                f()
+                coredumpy.config.profile_dump = False
+                f()
+            """
+            self.run_script(script)
+            stdout, _ = self.run_cli(["stats", path])
+            self.assertIn("No profile", stdout)
+
+            self.run_script(script.replace("= False", "= True"))
+            stdout, _ = self.run_cli(["stats", path, "--sort", "count"])
+            self.assertIn("objects traversed", stdout)
+            self.assertRegex(stdout, r"default_dump\[Point\] +100 ")
+            self.assertRegex(stdout, r"IntSupport +1\d\d ")
+
+            stdout, _ = self.run_cli(["stats", path, "--top", "1", "--sort", "count"])
+            self.assertNotIn("default_dump[Point]", stdout)
+
+            stdout, _ = self.run_cli(["stats", os.path.join(tmpdir, "nonexist")])
+            self.assertIn("not found", stdout)
+
+    def test_dump_metrics(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = f"""
+                import os
+                import coredumpy
+                from coredumpy.metrics import PHASES
+
+                metrics = []
+                coredumpy.config.dump_callbacks.append(metrics.append)
+                # A broken callback should not break the dump or the others
+                coredumpy.config.dump_callbacks.insert(0, lambda m: 1 / 0)
+                coredumpy.config.dedup_window = 60
+
+                def f():
+                    token = "a" * 40
+                    try:
+                        raise ValueError()
+                    except ValueError as e:
+                        coredumpy.dump(path={repr(path)}, exception=e)
+                for _ in range(2):
+                    f()
+                coredumpy.dumps()
+
+                first, duplicate, string = metrics
+                assert list(first.phases) == list(PHASES), first.phases
+                assert first.path == {repr(path)} and first.skipped is None
+                assert first.bytes_written == os.path.getsize({repr(path)})
+                assert first.object_count > 0 and first.redaction_count >= 1
+                assert first.exception == "ValueError" and not first.timed_out
+                assert first.total_time == sum(first.phases.values())
+                assert duplicate.skipped == "duplicate" and duplicate.path == {repr(path)}
+                assert not duplicate.phases
+                assert string.path is None and "compress" not in string.phases
+                assert string.bytes_written > 0
+                print(string.as_dict())
+            """
+            stdout, stderr = self.run_script(script)
+            self.assertIn("'phases'", stdout)
+            self.assertIn("ZeroDivisionError", stderr)
+
+    def test_lazy_import(self):
+        script = """
+            import sys
+            before = set(sys.modules)
+            import coredumpy
+            imported = set(sys.modules) - before
+            for module in ["argparse", "coredumpy.coredumpy", "gzip", "inspect", "json", "unittest"]:
+                if module in imported:
+                    print(f"{module} is imported")
+            print(coredumpy.dumps.__name__, coredumpy.main.__name__, coredumpy.pytest_hook.__name__)
+            print("dump" in dir(coredumpy))
+            coredumpy.nonexist
+        """
+        stdout, stderr = self.run_script(script, expected_returncode=1)
+        self.assertNotIn("is imported", stdout)
+        self.assertIn("dumps main coredumpy.pytest_hook", stdout)
+        self.assertIn("True", stdout)
+        self.assertIn("module 'coredumpy' has no attribute 'nonexist'", stderr)
@@ -0,0 +1,92 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import json
+import os
+import platform
+import tempfile
+
+from coredumpy.catalog import query_catalog, update_catalog
+
+from .base import TestBase
+
+
+class TestCatalog(TestBase):
+    def write_dump(self, path, node, dump_time, exception, function):
+        header = {
+            "description": None,
+            "metadata": {"version": "0", "python_version": "3", "dump_time": dump_time,
+                         "system": {"system": "Linux", "node": node, "release": "1"}},
+            "exception": exception,
+            "frame": {"name": function, "filename": "/src/app.py", "lineno": 3},
+            "thread_count": 1,
+        }
+        with open(path, "w") as f:
+            f.write(json.dumps(header) + "\n{}")
+
+    def test_query(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.mkdir(os.path.join(tmpdir, "sub"))
+            self.write_dump(os.path.join(tmpdir, "a.json"), "x", "2024-01-01 10:00:00", "KeyError", "handle")
+            self.write_dump(os.path.join(tmpdir, "b.json"), "y", "2024-01-02 10:00:00", "KeyError", "handle")
+            self.write_dump(os.path.join(tmpdir, "sub", "c.json"), "x", "2024-01-03 10:00:00", "ValueError", "f")
+            with open(os.path.join(tmpdir, "invalid"), "w") as f:
+                f.write("{invalid}")
+
+            self.assertEqual(update_catalog(tmpdir), (4, 0))
+            # Nothing changed
+            self.assertEqual(update_catalog(tmpdir), (0, 0))
+
+            dumps = query_catalog(tmpdir)
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["c.json", "b.json", "a.json"])
+            dumps = query_catalog(tmpdir, host="x", exception="KeyError")
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["a.json"])
+            dumps = query_catalog(tmpdir, function="handle", since="2024-01-02")
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["b.json"])
+            dumps = query_catalog(tmpdir, until="2024-01-02", filename="app", limit=1)
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["b.json"])
+            # A date only until includes the whole day
+            self.write_dump(os.path.join(tmpdir, "d.json"), "y", "2024-01-02 23:59:59", "KeyError", "handle")
+            update_catalog(tmpdir)
+            dumps = query_catalog(tmpdir, until="2024-01-02")
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["d.json", "b.json", "a.json"])
+            dumps = query_catalog(tmpdir, until="2024-01-02 12:00:00")
+            self.assertEqual([os.path.basename(d["path"]) for d in dumps], ["b.json", "a.json"])
+            os.remove(os.path.join(tmpdir, "d.json"))
+            self.assertEqual(update_catalog(tmpdir), (0, 1))
+
+            os.remove(os.path.join(tmpdir, "a.json"))
+            self.assertEqual(update_catalog(tmpdir), (0, 1))
+            self.assertEqual(len(query_catalog(tmpdir)), 2)
+
+            with self.assertRaises(FileNotFoundError):
+                query_catalog(os.path.join(tmpdir, "sub"))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            script = f"""
+                import coredumpy
+                coredumpy.patch_except(directory={repr(tmpdir)})
+                def handle_request():
+                    d = {{}}
+                    d["key"]
+                handle_request()
+            """
+            self.run_script(script, expected_returncode=1)
+
+            stdout, _ = self.run_cli(["ls", tmpdir])
+            self.assertIn("Catalog not found", stdout)
+
+            stdout, _ = self.run_cli(["index", tmpdir])
+            self.assertIn("1 files indexed", stdout)
+
+            stdout, _ = self.run_cli(["ls", tmpdir, "--exception", "KeyError", "--host", platform.node()])
+            self.assertIn("KeyError", stdout)
+            self.assertIn("handle_request (", stdout)
+            self.assertIn("script.py:6)", stdout)
+
+            stdout, _ = self.run_cli(["ls", tmpdir, "--exception", "ValueError"])
+            self.assertEqual(stdout, "")
+
+            stdout, _ = self.run_cli(["index", os.path.join(tmpdir, "nosuchdir")])
+            self.assertIn("not found", stdout)
@@ -13,6 +13,8 @@ import textwrap
 import threading
 import unittest
 
+from coredumpy.dap_server import CoredumpyDebugger, DumpCache, IdAdapter
+
 from .base import TestBase
 from .util import normalize_commands
 
@@ -21,12 +23,13 @@ DEBUG_PRINT = os.getenv("GITHUB_ACTIONS", None) is None
 
 
 class DapServer:
-    def __init__(self):
+    def __init__(self, args=None):
         self._process = None
+        self._args = args or []
 
     def __enter__(self):
         self._process = subprocess.Popen(
-            normalize_commands(["coredumpy", "host"]),
+            normalize_commands(["coredumpy", "host"] + self._args),
             stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL
@@ -64,14 +67,19 @@ class DapServer:
 
 
 class DapClient:
-    def __init__(self):
+    def __init__(self, unix_socket=None):
         self.host = "localhost"
         self.port = 6742
+        self.unix_socket = unix_socket
         self.seq = 1
         self.message_gen = None
 
     def __enter__(self):
-        self.sock = socket.create_connection((self.host, self.port))
+        if self.unix_socket is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.unix_socket)
+        else:
+            self.sock = socket.create_connection((self.host, self.port))
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -138,7 +146,7 @@ class DapClient:
             self.message_gen = self.receive_messages()
         return next(self.message_gen)
 
-    def send_initialize(self):
+    def send_initialize(self, supports_progress=False):
         """Send an 'initialize' request to the DAP server."""
         initialize_request = {
             "type": "request",
@@ -153,6 +161,7 @@ class DapClient:
                 "columnsStartAt1": True,
                 "supportsVariableType": True,
                 "supportsRunInTerminalRequest": False,
+                "supportsProgressReporting": supports_progress,
                 "locale": "en-US"
             }
         }
@@ -212,7 +221,7 @@ class DapClient:
         }
         self.send_message(threads_request)
 
-    def send_stack_trace(self, thread_id: int):
+    def send_stack_trace(self, thread_id: int, start_frame: int = 0, levels: int = 20):
         """Send a 'stackTrace' request to the DAP server."""
         stack_trace_request = {
             "type": "request",
@@ -220,8 +229,8 @@ class DapClient:
             "command": "stackTrace",
             "arguments": {
                 "threadId": thread_id,
-                "startFrame": 0,
-                "levels": 20
+                "startFrame": start_frame,
+                "levels": levels
             }
         }
         self.send_message(stack_trace_request)
@@ -250,7 +259,7 @@ class DapClient:
         }
         self.send_message(scope_request)
 
-    def send_variables(self, variables_reference):
+    def send_variables(self, variables_reference, start=None, count=None, filter=None):
         """Send a 'variables' request to the DAP server."""
         variables_request = {
             "type": "request",
@@ -260,6 +269,12 @@ class DapClient:
                 "variablesReference": variables_reference
             }
         }
+        if start is not None:
+            variables_request["arguments"]["start"] = start
+        if count is not None:
+            variables_request["arguments"]["count"] = count
+        if filter is not None:
+            variables_request["arguments"]["filter"] = filter
         self.send_message(variables_request)
 
     def send_evaluate(self, frame_id, expression):
@@ -299,6 +314,21 @@ class DapClient:
         }
         self.send_message(disconnect_request)
 
+    def send_cancel(self, request_id=None, progress_id=None):
+        """Send a 'cancel' request to the DAP server."""
+        arguments = {}
+        if request_id is not None:
+            arguments["requestId"] = request_id
+        if progress_id is not None:
+            arguments["progressId"] = progress_id
+        cancel_request = {
+            "type": "request",
+            "seq": self.seq,
+            "command": "cancel",
+            "arguments": arguments
+        }
+        self.send_message(cancel_request)
+
     def send_nonexist(self, args=None):
         """Send a non-existent request to the DAP server."""
         if args is None:
@@ -336,8 +366,8 @@ class PrepareDapTest(TestBase):
 
 
 class TestDapServer(TestBase):
-    def do_initialize(self, client: DapClient):
-        client.send_initialize()
+    def do_initialize(self, client: DapClient, supports_progress=False):
+        client.send_initialize(supports_progress=supports_progress)
         message = client.get_message()
         self.assertTrue(message["success"])
         message = client.get_message()
@@ -367,8 +397,8 @@ class TestDapServer(TestBase):
         self.assertTrue(message["success"])
         return message["body"]["threads"]
 
-    def do_stack_trace(self, client: DapClient, thread_id: int):
-        client.send_stack_trace(thread_id)
+    def do_stack_trace(self, client: DapClient, thread_id: int, start_frame=0, levels=20):
+        client.send_stack_trace(thread_id, start_frame, levels)
         message = client.get_message()
         self.assertTrue(message["success"])
         return message["body"]["stackFrames"]
@@ -385,8 +415,8 @@ class TestDapServer(TestBase):
         self.assertTrue(message["success"])
         return message["body"]["scopes"]
 
-    def do_variables(self, client: DapClient, variables_reference):
-        client.send_variables(variables_reference)
+    def do_variables(self, client: DapClient, variables_reference, start=None, count=None, filter=None):
+        client.send_variables(variables_reference, start=start, count=count, filter=filter)
         message = client.get_message()
         self.assertTrue(message["success"])
         return message["body"]["variables"]
@@ -544,6 +574,7 @@ class TestDapServer(TestBase):
                 import torch
                 def f():
                     t = torch.tensor([[1, 2], [3, 4]])
+                    r = torch.arange(100).reshape(50, 2)
                     coredumpy.dump(path={repr(path)})
                 f()
             """)
@@ -567,6 +598,81 @@ class TestDapServer(TestBase):
             self.assertEqual(tensor_0[1]["name"], "1")
             self.assertEqual(tensor_0[1]["value"], "2")
 
+            r = self.get_local_variable_from_frame(client, frame_id, "r")
+            assert r is not None
+            self.assertEqual(r["indexedVariables"], 50)
+            rows = self.do_variables(client, r["variablesReference"], start=10, count=5)
+            self.assertEqual([row["name"] for row in rows], ["10", "11", "12", "13", "14"])
+            row = self.do_variables(client, rows[0]["variablesReference"], start=1, count=1)
+            self.assertEqual(row, [{"name": "1", "value": "21", "type": "<class 'int'>", "variablesReference": 0}])
+
+            self.do_disconnect(client)
+
+    def test_large_containers(self):
+        with PrepareDapTest() as info:
+            tmpdir, server, client = info
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    lst = list(range(100000))
+                    d = {{i: i for i in range(1000)}}
+                    s = "hello world " * 30
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            self.do_initialize(client)
+            self.do_launch(client, path)
+            threads = self.do_threads(client)
+            stack_frames = self.do_stack_trace(client, threads[0]["id"])
+            frame_id = stack_frames[0]["id"]
+
+            lst = self.get_local_variable_from_frame(client, frame_id, "lst")
+            assert lst is not None
+            self.assertEqual(lst["indexedVariables"], 100000)
+            self.assertNotIn("namedVariables", lst)
+            # The preview is bounded
+            self.assertTrue(lst["value"].startswith("[0, 1, 2"))
+            self.assertTrue(lst["value"].endswith(", ...]"))
+
+            # The client asks for a page
+            items = self.do_variables(client, lst["variablesReference"], start=5, count=3, filter="indexed")
+            self.assertEqual([(item["name"], item["value"]) for item in items], [("5", "5"), ("6", "6"), ("7", "7")])
+            self.assertEqual(self.do_variables(client, lst["variablesReference"], filter="named"), [])
+
+            # The client does not page, the children are nested ranges
+            ranges = self.do_variables(client, lst["variablesReference"])
+            self.assertEqual([r["name"] for r in ranges], ["[0:90000]", "[90000:100000]"])
+            sub_ranges = self.do_variables(client, ranges[1]["variablesReference"])
+            self.assertEqual(sub_ranges[0]["name"], "[90000:90300]")
+            self.assertEqual(sub_ranges[-1]["name"], "[99900:100000]")
+            items = self.do_variables(client, sub_ranges[0]["variablesReference"])
+            self.assertEqual(len(items), 300)
+            self.assertEqual(items[0]["name"], "90000")
+            # The same range has the same reference
+            self.assertEqual(self.do_variables(client, lst["variablesReference"]), ranges)
+
+            d = self.get_local_variable_from_frame(client, frame_id, "d")
+            assert d is not None
+            self.assertEqual(d["namedVariables"], 1000)
+            ranges = self.do_variables(client, d["variablesReference"])
+            self.assertEqual([r["name"] for r in ranges], ["[0:300]", "[300:600]", "[600:900]", "[900:1000]"])
+            items = self.do_variables(client, ranges[3]["variablesReference"], start=1, count=2)
+            self.assertEqual([(item["name"], item["value"]) for item in items], [("901", "901"), ("902", "902")])
+            self.assertTrue(d["value"].startswith("{0: 0, 1: 1"))
+            self.assertTrue(d["value"].endswith(", ...}"))
+
+            s = self.get_local_variable_from_frame(client, frame_id, "s")
+            assert s is not None
+            self.assertEqual(s["value"], ("hello world " * 30)[:200] + "...")
+
+            # The cached preview is dropped after evaluate
+            self.do_evaluate(client, frame_id, "d[0] = 'changed'")
+            d = self.get_local_variable_from_frame(client, frame_id, "d")
+            assert d is not None
+            self.assertTrue(d["value"].startswith("{0: 'changed', 1: 1"))
+
             self.do_disconnect(client)
 
     def test_multithreading(self):
@@ -749,3 +855,367 @@ class TestDapServer(TestBase):
             self.do_launch(client, path)
             client.sock.close()
             client.sock = None
+
+    def test_concurrent_sessions(self):
+        with PrepareDapTest() as info:
+            tmpdir, server, client = info
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = 142857
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            with DapClient() as other_client:
+                # Interleave the requests of two sessions
+                self.do_initialize(client)
+                self.do_initialize(other_client)
+                self.do_launch(client, path)
+                self.do_launch(other_client, path)
+                for c in (client, other_client):
+                    threads = self.do_threads(c)
+                    stack_frames = self.do_stack_trace(c, threads[0]["id"])
+                    x = self.get_local_variable_value_from_frame(c, stack_frames[0]["id"], "x")
+                    self.assertEqual(x, "142857")
+                    self.assertEqual(self.do_evaluate(c, stack_frames[0]["id"], "x + 1"), "142858")
+                self.do_disconnect(other_client)
+            self.do_disconnect(client)
+
+    @unittest.skipIf(sys.platform == "win32", "Unix domain socket is not supported")
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            unix_socket = os.path.join(tmpdir, "dap.sock")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = 142857
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            with DapServer(["--unix", unix_socket]), DapClient(unix_socket=unix_socket) as client:
+                self.do_initialize(client)
+                self.do_launch(client, path)
+                threads = self.do_threads(client)
+                stack_frames = self.do_stack_trace(client, threads[0]["id"])
+                x = self.get_local_variable_value_from_frame(client, stack_frames[0]["id"], "x")
+                self.assertEqual(x, "142857")
+                self.do_disconnect(client)
+
+    def test_dump_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = [os.path.join(tmpdir, f"coredumpy_dump_{i}") for i in range(2)]
+            for path in paths:
+                script = textwrap.dedent(f"""
+                    import coredumpy
+                    def f():
+                        x = 142857
+                        coredumpy.dump(path={repr(path)})
+                    f()
+                """)
+                self.run_script(script)
+
+            cache = DumpCache(1024 * 1024 * 1024)
+            data = cache.get(paths[0])
+            self.assertIs(cache.get(paths[0]), data)
+            self.assertGreater(cache.size, 0)
+
+            # A rewritten file is loaded again and replaces the old entry
+            stat = os.stat(paths[0])
+            os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            new_data = cache.get(paths[0])
+            self.assertIsNot(new_data, data)
+            self.assertIs(cache.get(paths[0]), new_data)
+
+            # Only the most recently used dump fits in the budget
+            cache = DumpCache(cache.size + 1)
+            data = cache.get(paths[0])
+            other_data = cache.get(paths[1])
+            self.assertIs(cache.get(paths[1]), other_data)
+            self.assertIsNot(cache.get(paths[0]), data)
+
+            # A failed load does not leave an in-progress entry
+            invalid = os.path.join(tmpdir, "invalid")
+            with open(invalid, "w") as f:
+                f.write("{invalid}")
+            with self.assertRaises(Exception):
+                cache.get(invalid)
+            self.assertEqual(cache._loading, {})
+
+    def test_dump_cache_isolation(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    lst = [1, 2, 3]
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+
+            with DapServer():
+                with DapClient() as client:
+                    self.do_initialize(client)
+                    self.do_launch(client, path)
+                    threads = self.do_threads(client)
+                    frame_id = self.do_stack_trace(client, threads[0]["id"])[0]["id"]
+                    self.do_evaluate(client, frame_id, "lst.clear()")
+                    self.do_evaluate(client, frame_id, "y = 42")
+                    self.assertEqual(self.do_evaluate(client, frame_id, "(lst, y)"), "([], 42)")
+                    self.do_disconnect(client)
+
+                # The changes of the first session are not visible to the next one
+                with DapClient() as client:
+                    self.do_initialize(client)
+                    self.do_launch(client, path)
+                    threads = self.do_threads(client)
+                    frame_id = self.do_stack_trace(client, threads[0]["id"])[0]["id"]
+                    self.assertEqual(self.do_evaluate(client, frame_id, "lst"), "[1, 2, 3]")
+                    self.assertIn("NameError", self.do_evaluate(client, frame_id, "y"))
+                    self.do_disconnect(client)
+
+    def test_timed_out_dump(self):
+        with PrepareDapTest() as info:
+            tmpdir, server, client = info
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = 142857
+                    # Only the frames are dumped, their attributes are unknown
+                    coredumpy.config.dump_timeout = 0
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            self.do_initialize(client)
+            self.do_launch(client, path)
+            threads = self.do_threads(client)
+            stack_frames = self.do_stack_trace(client, threads[0]["id"])
+            self.assertEqual(len(stack_frames), 2)
+            scopes = self.do_scope(client, stack_frames[0]["id"])
+            self.assertEqual([scope["name"] for scope in scopes], ["Local", "Global"])
+            for scope in scopes:
+                self.assertNotIn("namedVariables", scope)
+                self.assertEqual(self.do_variables(client, scope["variablesReference"]), [])
+            self.do_disconnect(client)
+
+    def test_lazy_rid(self):
+        adapter = IdAdapter()
+        objs = [[i] for i in range(3)]
+        self.assertEqual(len(adapter), 0)
+        rids = [adapter.object_to_rid(obj) for obj in objs]
+        self.assertEqual(len(set(rids)), 3)
+        self.assertEqual(adapter.object_to_rid(objs[1]), rids[1])
+        self.assertIs(adapter.rid_to_object(rids[2]), objs[2])
+        self.assertIsNone(adapter.rid_to_object(12345))
+        self.assertEqual(len(adapter), 3)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = [[i] for i in range(1000)]
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            debugger = CoredumpyDebugger(path)
+            debugger.start()
+            self.assertEqual(len(debugger.id_adapter), 0)
+            # Only the frames sent to the client are registered
+            stack_frames, frame_count = debugger.get_stack_trace(int(debugger.current_thread))
+            self.assertEqual(len(debugger.id_adapter), frame_count)
+            frame_id = stack_frames[0]["id"]
+            local_reference = debugger.get_scopes(frame_id)[0]["variablesReference"]
+            x = debugger.get_variables(local_reference)[0]
+            self.assertEqual(x["name"], "x")
+            self.assertEqual(len(debugger.get_variables(x["variablesReference"], start=0, count=10)), 10)
+            self.assertLess(len(debugger.id_adapter), frame_count + 20)
+
+    def test_deep_stack(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f(n):
+                    if n == 0:
+                        coredumpy.dump(path={repr(path)})
+                    else:
+                        f(n - 1)
+                f(500)
+            """)
+            self.run_script(script)
+
+            with DapServer(), DapClient() as client:
+                self.do_initialize(client)
+                self.do_launch(client, path)
+                threads = self.do_threads(client)
+
+                client.send_stack_trace(threads[0]["id"], 10, 5)
+                message = client.get_message()
+                self.assertTrue(message["success"])
+                stack_frames = message["body"]["stackFrames"]
+                self.assertEqual(len(stack_frames), 5)
+                # f(0) to f(500) and the module frame
+                self.assertEqual(message["body"]["totalFrames"], 502)
+                self.assertEqual([frame["name"] for frame in stack_frames], ["f"] * 5)
+                scopes = self.do_scope(client, stack_frames[0]["id"])
+                variables = self.do_variables(client, scopes[0]["variablesReference"])
+                self.assertEqual(variables[0]["value"], "10")
+
+                # levels 0 means all the frames from startFrame
+                stack_frames = self.do_stack_trace(client, threads[0]["id"], 495, 0)
+                self.assertEqual(len(stack_frames), 7)
+                self.assertEqual(stack_frames[-1]["name"], "<module>")
+                self.assertEqual(self.do_stack_trace(client, threads[0]["id"], 600, 10), [])
+
+    def test_collapse_recursion(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                coredumpy.config.collapse_recursion = 1
+                def f(n):
+                    if n == 0:
+                        coredumpy.dump(path={repr(path)})
+                    else:
+                        f(n - 1)
+                f(50)
+            """)
+            self.run_script(script)
+            debugger = CoredumpyDebugger(path)
+            debugger.start()
+            stack_frames, total_frames = debugger.get_stack_trace(int(debugger.current_thread))
+            # f(0), f(1), the marker of f(2) to f(49), f(50) and the module
+            self.assertEqual(total_frames, 5)
+            self.assertEqual(stack_frames[2]["name"], "<48 repeated frames collapsed>")
+            self.assertEqual(stack_frames[2]["presentationHint"], "label")
+            self.assertNotIn("presentationHint", stack_frames[1])
+            self.assertEqual(debugger.get_scopes(stack_frames[3]["id"])[0]["namedVariables"], 1)
+
+            stdout, _ = self.run_peek([path])
+            self.assertIn("48 repeated frames of recursion collapsed", stdout)
+
+    def test_launch_progress(self):
+        with PrepareDapTest() as info:
+            tmpdir, server, client = info
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = [str(i) for i in range(30000)]
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            self.do_initialize(client, supports_progress=True)
+            client.send_launch(path)
+            messages = []
+            while not messages or messages[-1].get("event") != "stopped":
+                messages.append(client.get_message())
+            events = [message.get("event", message.get("command")) for message in messages]
+            self.assertEqual(events[0], "progressStart")
+            self.assertIn("progressUpdate", events)
+            self.assertEqual(events[-3:], ["progressEnd", "launch", "stopped"])
+            progress_ids = set(message["body"]["progressId"] for message in messages[:-2])
+            self.assertEqual(len(progress_ids), 1)
+            self.do_disconnect(client)
+
+    def test_launch_cancel(self):
+        with PrepareDapTest() as info:
+            tmpdir, server, client = info
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    x = [str(i) for i in range(200000)]
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            self.do_initialize(client)
+
+            # Unknown or malformed ids are acknowledged and ignored
+            for kwargs in ({"request_id": 12345}, {"progress_id": "launch-abc"}, {"progress_id": "other"}):
+                client.send_cancel(**kwargs)
+                message = client.get_message()
+                self.assertEqual(message["command"], "cancel")
+                self.assertTrue(message["success"])
+
+            launch_seq = client.seq
+            client.send_launch(path)
+            client.send_cancel(launch_seq)
+            responses = {}
+            while "launch" not in responses:
+                message = client.get_message()
+                responses[message["command"]] = message
+            self.assertTrue(responses["cancel"]["success"])
+            self.assertFalse(responses["launch"]["success"])
+            self.assertEqual(responses["launch"]["message"], "cancelled")
+
+            # The session still works
+            self.do_launch(client, path)
+            threads = self.do_threads(client)
+            self.assertEqual(len(threads), 1)
+            self.do_disconnect(client)
+
+    def test_evaluate_deadline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "coredumpy_dump")
+            script = textwrap.dedent(f"""
+                import coredumpy
+                def f():
+                    d = {{"a": [1, 2, 3]}}
+                    coredumpy.dump(path={repr(path)})
+                f()
+            """)
+            self.run_script(script)
+            with DapServer(["--eval-timeout", "0.5"]), DapClient() as client:
+                self.do_initialize(client)
+                self.do_launch(client, path)
+                threads = self.do_threads(client)
+                frame_id = self.do_stack_trace(client, threads[0]["id"])[0]["id"]
+
+                self.assertIn("TimeoutError", self.do_evaluate(client, frame_id, "sum(i for i in range(10 ** 10))"))
+
+                # The code that catches the exceptions is still stopped
+                swallow = textwrap.dedent("""
+                    def g(i):
+                        return i
+                    total = 0
+                    for i in range(10 ** 10):
+                        try:
+                            total += g(i)
+                        except {}:
+                            pass
+                """)
+                self.assertIn("TimeoutError", self.do_evaluate(client, frame_id, swallow.format("Exception")))
+                self.assertIn("TimeoutError", self.do_evaluate(client, frame_id, swallow.format("BaseException")))
+
+                # A structured result could be expanded
+                client.send_evaluate(frame_id, "d['a']")
+                message = client.get_message()
+                self.assertEqual(message["body"]["result"], "[1, 2, 3]")
+                self.assertEqual(message["body"]["indexedVariables"], 3)
+                items = self.do_variables(client, message["body"]["variablesReference"])
+                self.assertEqual([item["value"] for item in items], ["1", "2", "3"])
+
+                for expression in ("sum(i for i in range(10 ** 10))", swallow.format("Exception")):
+                    evaluate_seq = client.seq
+                    client.send_evaluate(frame_id, expression)
+                    client.send_cancel(evaluate_seq)
+                    responses = {}
+                    while "evaluate" not in responses:
+                        message = client.get_message()
+                        responses[message["command"]] = message
+                    self.assertFalse(responses["evaluate"]["success"])
+                    self.assertEqual(responses["evaluate"]["message"], "cancelled")
+
+                self.assertEqual(self.do_evaluate(client, frame_id, "d['a'][0]"), "1")
+                self.do_disconnect(client)
@@ -0,0 +1,151 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from coredumpy import config, dump, policy
+from coredumpy.coredumpy import load_header_from_path
+from coredumpy.policy import INTERNAL_FILE_PREFIX, get_crash_signature, rate_limiter
+from coredumpy.summary_index import get_directory_headers
+
+from .base import TestBase
+
+
+class TestPolicy(TestBase):
+    def setUp(self):
+        self._config = {name: getattr(config, name)
+                        for name in ("dedup_window", "dump_rate_limit", "dump_rate_period", "dump_dir_quota")}
+        rate_limiter.reset()
+
+    def tearDown(self):
+        for name, value in self._config.items():
+            setattr(config, name, value)
+        rate_limiter.reset()
+
+    def crash(self, exc_type=ValueError):
+        try:
+            raise exc_type()
+        except exc_type as e:
+            return e, sys._getframe()
+
+    def test_signature(self):
+        e1, frame1 = self.crash()
+        e2, frame2 = self.crash()
+        e3, frame3 = self.crash(KeyError)
+        self.assertEqual(get_crash_signature(e1, frame1), get_crash_signature(e2, frame2))
+        self.assertNotEqual(get_crash_signature(e1, frame1), get_crash_signature(e3, frame3))
+
+    def test_dedup(self):
+        config.dedup_window = 60
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for _ in range(3):
+                try:
+                    raise ValueError()
+                except ValueError as e:
+                    paths.append(dump(directory=tmpdir, exception=e))
+            self.assertEqual(len(set(paths)), 1)
+
+            counters = [filename for filename in os.listdir(tmpdir) if filename.endswith(".count")]
+            self.assertEqual(len(counters), 1)
+            self.assertTrue(counters[0].startswith(INTERNAL_FILE_PREFIX))
+            with open(os.path.join(tmpdir, counters[0])) as f:
+                self.assertEqual(json.load(f)["count"], 3)
+
+            # A different crash is dumped
+            try:
+                raise KeyError()
+            except KeyError as e:
+                self.assertNotEqual(dump(directory=tmpdir, exception=e), paths[0])
+
+            # The counter files are not dumps
+            self.assertEqual(len(get_directory_headers(tmpdir)), 2)
+
+            # The previous dump is gone, dump again
+            os.remove(paths[0])
+            try:
+                raise ValueError()
+            except ValueError as e:
+                self.assertTrue(os.path.exists(dump(directory=tmpdir, exception=e)))
+
+    def test_dedup_disabled(self):
+        config.dedup_window = 0
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = set()
+            for _ in range(2):
+                try:
+                    raise ValueError()
+                except ValueError as e:
+                    paths.add(dump(directory=tmpdir, exception=e))
+            self.assertEqual(len(paths), 2)
+
+    def test_rate_limit(self):
+        config.dump_rate_limit = 2
+        config.dump_rate_period = 3600
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = [dump(directory=tmpdir) for _ in range(5)]
+            self.assertIsNotNone(paths[0])
+            self.assertIsNotNone(paths[1])
+            self.assertEqual(paths[2:], [None, None, None])
+            self.assertEqual(load_header_from_path(paths[1])["metadata"]["suppressed_dumps"], 0)
+
+            # Refill the bucket
+            config.dump_rate_period = 1
+            time.sleep(0.6)
+            path = dump(directory=tmpdir)
+            self.assertIsNotNone(path)
+            self.assertEqual(load_header_from_path(path)["metadata"]["suppressed_dumps"], 3)
+
+    def test_quota(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            other = os.path.join(tmpdir, "other.txt")
+            with open(other, "w") as f:
+                f.write("x" * 10000)
+            first = dump(directory=tmpdir)
+            size = os.path.getsize(first)
+            os.utime(first, (time.time() - 10, time.time() - 10))
+
+            config.dump_dir_quota = size * 3 // 2
+            second = dump(directory=tmpdir)
+            self.assertFalse(os.path.exists(first))
+            self.assertTrue(os.path.exists(second))
+            # Only dumps are counted and removed
+            self.assertTrue(os.path.exists(other))
+
+            # The new dump is kept even if it alone exceeds the quota
+            config.dump_dir_quota = 1
+            third = dump(directory=tmpdir)
+            self.assertFalse(os.path.exists(second))
+            self.assertTrue(os.path.exists(third))
+
+    def test_quota_non_dump(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = {
+                "settings.json": json.dumps({"important": "user data"}),
+                "list.json": "[1, 2]",
+                # A json file that looks like a dump header, but is not gzipped
+                # and does not have the name of a dump
+                "fake.json": json.dumps({"metadata": {"version": "0.0.1", "dump_time": ""}}),
+            }
+            for filename, content in files.items():
+                path = os.path.join(tmpdir, filename)
+                with open(path, "w") as f:
+                    f.write(content)
+                os.utime(path, (time.time() - 10, time.time() - 10))
+
+            config.dump_dir_quota = 1
+            path = dump(directory=tmpdir)
+            self.assertTrue(os.path.exists(path))
+            for filename in files:
+                self.assertTrue(os.path.exists(os.path.join(tmpdir, filename)))
+
+            # Any error of the quota should not break the dump
+            with mock.patch.object(policy, "_is_dump", side_effect=AttributeError("broken")), \
+                    mock.patch("sys.stderr"):
+                path = dump(directory=tmpdir)
+            self.assertTrue(os.path.exists(path))
@@ -53,3 +53,29 @@ class TestPyObjectProxy(TestBase):
 
         with self.assertRaises(AttributeError):
             proxy.z
+
+    def test_shape(self):
+        container = PyObjectContainer()
+        proxies = []
+        for i in range(3):
+            proxy = PyObjectProxy()
+            proxy.link_container(container)
+            proxy.set_coredumpy_attrs({"x": str(id(i)), "y": str(id(None))})
+            proxies.append(proxy)
+        container.add_objects([0, 1, 2, None])
+        container.load_objects(container.get_objects())
+
+        self.assertFalse(hasattr(proxies[0], "__weakref__"))
+        self.assertIs(proxies[0]._coredumpy_shape, proxies[1]._coredumpy_shape)
+        self.assertEqual(proxies[2]._coredumpy_attrs, {"x": str(id(2)), "y": str(id(None))})
+        self.assertEqual([proxy.x for proxy in proxies], [0, 1, 2])
+        # Resolved attributes are cached on the proxy
+        self.assertEqual(vars(proxies[0]), {"x": 0})
+        self.assertEqual(dir(proxies[0]), ["x", "y"])
+
+        proxies[1].set_coredumpy_attr("z", str(id(None)))
+        self.assertIsNone(proxies[1].z)
+        self.assertIsNot(proxies[0]._coredumpy_shape, proxies[1]._coredumpy_shape)
+        self.assertEqual(dir(proxies[1]), ["x", "y", "z"])
+        proxies[1].set_coredumpy_attr("x", str(id(2)))
+        self.assertEqual(proxies[1].x, 2)
@@ -0,0 +1,69 @@
+# Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
+# For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
+
+import json
+import os
+import tempfile
+from unittest import mock
+
+from coredumpy import summary_index
+from coredumpy.summary_index import INDEX_FILENAME, get_directory_headers
+
+from .base import TestBase
+
+
+class TestSummaryIndex(TestBase):
+    def write_dump(self, path, description):
+        with open(path, "w") as f:
+            f.write(json.dumps({"description": description, "metadata": {}}) + "\n{}")
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "a.json")
+            self.write_dump(path, "aaa")
+            with open(os.path.join(tmpdir, "invalid"), "w") as f:
+                f.write("{invalid}")
+
+            headers = get_directory_headers(tmpdir)
+            self.assertEqual(headers, [(path, {"description": "aaa", "metadata": {}})])
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, INDEX_FILENAME)))
+
+            # Same mtime and size, the cached header should be used
+            stat = os.stat(path)
+            self.write_dump(path, "bbb")
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            with mock.patch.object(summary_index, "load_header_from_path") as load:
+                headers = get_directory_headers(tmpdir)
+                load.assert_not_called()
+            self.assertEqual(headers[0][1]["description"], "aaa")
+
+            # Only the changed file is read again
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            with mock.patch.object(summary_index, "load_header_from_path",
+                                   wraps=summary_index.load_header_from_path) as load:
+                headers = get_directory_headers(tmpdir)
+                load.assert_called_once_with(path)
+            self.assertEqual(headers[0][1]["description"], "bbb")
+
+            os.remove(path)
+            self.assertEqual(get_directory_headers(tmpdir), [])
+
+    def test_not_dump(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "a.json")
+            self.write_dump(path, "aaa")
+            # Valid json on the first line, but not a dump
+            for filename, content in (("list.json", "[1]"), ("number.json", "1"), ("dict.json", '{"a": 1}')):
+                with open(os.path.join(tmpdir, filename), "w") as f:
+                    f.write(content)
+            self.assertEqual(get_directory_headers(tmpdir), [(path, {"description": "aaa", "metadata": {}})])
+
+    def test_parallel(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            count = summary_index.PARALLEL_THRESHOLD + 4
+            for i in range(count):
+                self.write_dump(os.path.join(tmpdir, f"{i}.json"), str(i))
+            headers = get_directory_headers(tmpdir, jobs=2)
+            self.assertEqual(len(headers), count)
+            for path, header in headers:
+                self.assertEqual(os.path.basename(path), f"{header['description']}.json")
@@ -1,6 +1,7 @@
 # Licensed under the Apache License: http://www.apache.org/licenses/LICENSE-2.0
 # For details: https://github.com/gaogaotiantian/coredumpy/blob/master/NOTICE.txt
 
+import json
 import sys
 
 from coredumpy.py_object_container import PyObjectContainer
@@ -36,6 +37,88 @@ class TestTypeSupport(TestBase):
         proxy = self.convert_object(obj)
         self.assertEqual(proxy, frozenset([1, 2, 3]))
 
+    def test_collections(self):
+        import collections
+        Point = collections.namedtuple("Point", ["x", "y"])
+        test_case = [
+            collections.deque([1, "a", None], maxlen=5),
+            collections.OrderedDict([("b", 1), ("a", [2, 3])]),
+            collections.defaultdict(list, {"a": [1]}),
+            collections.Counter("hello"),
+            collections.ChainMap({"a": 1}, {"b": 2}),
+            Point(1, [2, 3]),
+        ]
+        for obj in test_case:
+            proxy = self.convert_object(obj)
+            if not isinstance(obj, Point):
+                self.assertIs(type(proxy), type(obj))
+            self.assertEqual(proxy, obj)
+
+        proxy = self.convert_object(test_case[0])
+        self.assertEqual(proxy.maxlen, 5)
+        proxy = self.convert_object(test_case[1])
+        self.assertEqual(list(proxy.keys()), ["b", "a"])
+        proxy = self.convert_object(test_case[2])
+        self.assertIs(proxy.default_factory, list)
+        proxy = self.convert_object(test_case[-1])
+        self.assertEqual(type(proxy).__name__, "Point")
+        self.assertEqual(proxy.y, [2, 3])
+
+    def test_collections_cycle(self):
+        import collections
+        d = collections.OrderedDict()
+        q = collections.deque([d])
+        d["q"] = q
+        d["self"] = d
+        c = collections.ChainMap(d, {"d": d})
+        d["c"] = c
+        proxy = self.convert_object(c)
+        self.assertIs(proxy.maps[0]["self"], proxy.maps[0])
+        self.assertIs(proxy.maps[0]["q"][0], proxy.maps[0])
+        self.assertIs(proxy.maps[1]["d"]["c"], proxy)
+        self.assertEqual(list(proxy.maps[0].keys()), ["q", "self", "c"])
+
+    def test_stdlib_values(self):
+        import datetime
+        import enum
+        import fractions
+        import ipaddress
+        import pathlib
+        import re
+        import uuid
+
+        class Color(enum.Enum):
+            RED = 1
+            BLUE = "blue"
+
+        test_case = [
+            datetime.datetime(2024, 1, 2, 3, 4, 5, 678, tzinfo=datetime.timezone(datetime.timedelta(hours=8))),
+            datetime.date(2024, 1, 2),
+            datetime.time(3, 4, 5),
+            datetime.timedelta(days=-1, seconds=5, microseconds=7),
+            uuid.uuid4(),
+            pathlib.Path("a/b.txt"),
+            pathlib.PureWindowsPath("C:\\a\\b.txt"),
+            fractions.Fraction(3, 7),
+            re.compile(r"a+b", re.IGNORECASE),
+            re.compile(rb"\x00+"),
+            ipaddress.ip_address("127.0.0.1"),
+            ipaddress.ip_address("::1"),
+            ipaddress.ip_network("10.0.0.0/8"),
+            ipaddress.ip_interface("192.168.1.2/24"),
+            re.RegexFlag.IGNORECASE,
+        ]
+        for obj in test_case:
+            proxy = self.convert_object(obj)
+            self.assertIs(type(proxy), type(obj))
+            self.assertEqual(proxy, obj)
+
+        # The enum class is defined locally so a similar one is created
+        proxy = self.convert_object(Color.BLUE)
+        self.assertIsInstance(proxy, enum.Enum)
+        self.assertEqual(proxy.name, "BLUE")
+        self.assertEqual(proxy.value, "blue")
+
     def test_bool(self):
         obj = True
         proxy = self.convert_object(obj)
@@ -70,6 +153,29 @@ class TestTypeSupport(TestBase):
             proxy = self.convert_object(obj)
             self.assertEqual(proxy, obj)
 
+    def test_long_chain(self):
+        # Immutable chains used to be resolved with repeated retries
+        obj: tuple = ()
+        for i in range(2000):
+            obj = (obj, frozenset([i]))
+        container = PyObjectContainer()
+        container.add_object(obj, depth=4010)
+        container.load_objects(container.get_objects())
+        proxy = container.get_object(str(id(obj)))
+        for i in reversed(range(2000)):
+            self.assertEqual(proxy[1], frozenset([i]))
+            proxy = proxy[0]
+        self.assertEqual(proxy, ())
+
+    def test_self_reference(self):
+        lst: list = []
+        lst.append(lst)
+        dct: dict = {}
+        dct[(1, "a")] = dct
+        proxy = self.convert_object([lst, dct])
+        self.assertIs(proxy[0][0], proxy[0])
+        self.assertIs(proxy[1][(1, "a")], proxy[1])
+
     def test_builtins(self):
         obj = object()
         proxy = self.convert_object(obj)
@@ -160,6 +266,87 @@ class TestTypeSupport(TestBase):
         proxy = self.convert_object(t)
         self.assertTrue((proxy == t).all())
 
+    def test_torch_storage_dedup(self):
+        import torch
+        buffer = torch.arange(12, dtype=torch.float32).reshape(3, 4)
+        views = [buffer, buffer[1], buffer[:, 2], buffer.t()]
+        container = PyObjectContainer()
+        container.add_object(views)
+        storages = [data for data in container.get_objects().values() if data["type"] == "torch.UntypedStorage"]
+        self.assertEqual(len(storages), 1)
+
+        container.load_objects(container.get_objects())
+        proxy = container.get_object(str(id(views)))
+        for view, loaded in zip(views, proxy):
+            self.assertEqual(view.stride(), loaded.stride())
+            self.assertTrue((view == loaded).all())
+        self.assertEqual(proxy[0].untyped_storage().data_ptr(), proxy[1].untyped_storage().data_ptr())
+
+    def test_torch_summary(self):
+        import torch
+        from coredumpy import config
+        from coredumpy.types.torch_types import TorchTensorSummary
+        t = torch.arange(100, dtype=torch.float32)
+        try:
+            config.tensor_summary_threshold = 100
+            proxy = self.convert_object(t)
+        finally:
+            config.tensor_summary_threshold = 0
+        self.assertIsInstance(proxy, TorchTensorSummary)
+        self.assertEqual(proxy.shape, (100,))
+        self.assertEqual(proxy.min, 0)
+        self.assertEqual(proxy.max, 99)
+        self.assertIn("float32", repr(proxy))
+
+    def test_torch_summary_view(self):
+        import torch
+        from coredumpy import config
+        buffer = torch.arange(1000, dtype=torch.float32)
+        view = buffer[10:14]
+        container = PyObjectContainer()
+        try:
+            config.tensor_summary_threshold = 100
+            container.add_object(view)
+        finally:
+            config.tensor_summary_threshold = 0
+        # Only the view is dumped, not the large storage
+        self.assertFalse(any(data["type"] == "torch.UntypedStorage" for data in container.get_objects().values()))
+        self.assertLess(len(json.dumps(container.get_objects())), 1000)
+
+        container.load_objects(container.get_objects())
+        proxy = container.get_object(str(id(view)))
+        self.assertTrue((proxy == view).all())
+
+    def test_torch_lazy_views(self):
+        import torch
+        from coredumpy import config
+        t = torch.tensor([1 + 2j, 3 - 4j] * 50)[:2]
+        r = torch.tensor([1.0, -2.0] * 50)[:2]
+        for threshold in (0, 100):
+            try:
+                # With the threshold, the small views of the large storages
+                # are dumped inline
+                config.tensor_summary_threshold = threshold
+                for view in (t.conj(), torch._neg_view(r), torch._neg_view(t.conj())):
+                    proxy = self.convert_object(view)
+                    self.assertTrue(torch.equal(proxy.resolve_conj().resolve_neg(),
+                                                view.resolve_conj().resolve_neg()))
+            finally:
+                config.tensor_summary_threshold = 0
+
+    def test_torch_depth_limit(self):
+        import torch
+        from coredumpy.types.torch_types import TorchTensorSummary
+        t = torch.arange(6, dtype=torch.float32).reshape(2, 3)
+        container = PyObjectContainer()
+        # The storage is out of the depth limit
+        container.add_objects([[t]], depth=2)
+        container.load_objects(container.get_objects())
+        proxy = container.get_object(str(id(t)))
+        self.assertIsInstance(proxy, TorchTensorSummary)
+        self.assertEqual(proxy.shape, (2, 3))
+        self.assertEqual(proxy.numel, 6)
+
     def test_nonexist_attr(self):
         class A:
             def __init__(self, x):